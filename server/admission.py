@@ -0,0 +1,195 @@
+"""Admission control: per-route concurrency limits, per-client rate limits and backlog shedding"""
+
+import json
+import math
+import os
+import threading
+import time
+
+from flask import g, jsonify, request
+
+# Route groups: Flask endpoint name -> group. Endpoints not listed fall into 'read'.
+ROUTE_GROUPS = {
+    'upload_document': 'upload',
+    'bulk_upload_documents': 'upload',
+    'scan_upload_backlog': 'upload',
+    'post_decision': 'write',
+    'review_bank_statement': 'write',
+    'review_occupation_form': 'write',
+    'delete_document': 'write',
+    'export_records': 'export',
+}
+
+# Endpoints that bypass admission control entirely
+EXEMPT_ENDPOINTS = {'health_check', 'get_admission_stats', 'static'}
+
+# Per-group limits. concurrency: max in-flight requests (0 = unlimited);
+# rate / burst: token bucket per client (requests per second, bucket size; 0 = unlimited);
+# shed_backlog: reject when the document-processing backlog is above max_backlog
+DEFAULT_LIMITS = {
+    'upload': {'concurrency': 8, 'rate': 1.0, 'burst': 10, 'shed_backlog': True},
+    'write': {'concurrency': 16, 'rate': 5.0, 'burst': 20, 'shed_backlog': False},
+    'export': {'concurrency': 2, 'rate': 0.2, 'burst': 2, 'shed_backlog': False},
+    'read': {'concurrency': 0, 'rate': 50.0, 'burst': 100, 'shed_backlog': False},
+}
+
+
+class TokenBucket:
+    __slots__ = ('tokens', 'updated')
+
+    def __init__(self, capacity, now):
+        self.tokens = capacity
+        self.updated = now
+
+
+class RouteGroup:
+    """Limits and counters for one route group"""
+
+    def __init__(self, name, concurrency=0, rate=0.0, burst=0, shed_backlog=False):
+        self.name = name
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.shed_backlog = shed_backlog
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.admitted = 0
+        self.rejected = {'concurrency': 0, 'rate_limit': 0, 'backlog': 0}
+        self.buckets = {}
+
+    def take_token(self, client, now):
+        """Consume a token for ``client``; returns seconds to wait if none is available"""
+        if not self.rate:
+            return 0
+        bucket = self.buckets.get(client)
+        if bucket is None:
+            if len(self.buckets) > 10000:
+                self._prune(now)
+            bucket = self.buckets[client] = TokenBucket(self.burst, now)
+        bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+        bucket.updated = now
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return 0
+        return (1 - bucket.tokens) / self.rate
+
+    def _prune(self, now):
+        # Buckets that would have refilled completely carry no state worth keeping
+        full_after = self.burst / self.rate
+        self.buckets = {
+            client: bucket for client, bucket in self.buckets.items()
+            if now - bucket.updated < full_after
+        }
+
+
+class AdmissionController:
+    """
+    Flask extension deciding, before a route runs, whether to admit it.
+
+    Checks in order: backlog shedding (503) for groups with ``shed_backlog``
+    when ``backlog()`` exceeds ``max_backlog``; per-client token bucket
+    (429); per-group concurrency limit (503). Rejections carry a
+    Retry-After header. Exempt endpoints (health checks) skip all checks,
+    so they are answered even while uploads are being shed.
+    """
+
+    def __init__(self, limits=None, backlog=None, max_backlog=100, retry_after=2, enabled=True):
+        self.enabled = enabled
+        self.backlog = backlog or (lambda: 0)
+        self.max_backlog = max_backlog
+        self.retry_after = retry_after
+        self.groups = {
+            name: RouteGroup(name, **settings)
+            for name, settings in (limits or DEFAULT_LIMITS).items()
+        }
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, backlog=None, environ=None):
+        """
+        Build from KYC_ADMISSION (0 disables), KYC_MAX_BACKLOG and
+        KYC_ADMISSION_LIMITS, a JSON object overriding DEFAULT_LIMITS per
+        group, e.g. '{"upload": {"concurrency": 4, "rate": 0.5}}'.
+        """
+        env = os.environ if environ is None else environ
+        limits = {name: dict(settings) for name, settings in DEFAULT_LIMITS.items()}
+        for name, overrides in json.loads(env.get('KYC_ADMISSION_LIMITS', '{}')).items():
+            limits.setdefault(name, dict(DEFAULT_LIMITS['read'])).update(overrides)
+        return cls(
+            limits=limits,
+            backlog=backlog,
+            max_backlog=int(env.get('KYC_MAX_BACKLOG', '100')),
+            retry_after=int(env.get('KYC_RETRY_AFTER', '2')),
+            enabled=env.get('KYC_ADMISSION', '1').lower() not in ('0', 'false'),
+        )
+
+    def init_app(self, app):
+        if not self.enabled:
+            return
+        app.before_request(self._before)
+        app.teardown_request(self._teardown)
+
+    def _client(self):
+        # X-Forwarded-For is client-controlled; behind a proxy, ProxyFix
+        # (KYC_PROXY_FIX in app.py) sets remote_addr from trusted hops only
+        return request.remote_addr or 'unknown'
+
+    def _reject(self, group, reason, status, retry_after):
+        group.rejected[reason] += 1
+        response = jsonify({"error": "overloaded" if status == 503 else "rate_limited",
+                            "reason": reason, "retryAfter": retry_after})
+        response.status_code = status
+        response.headers['Retry-After'] = str(retry_after)
+        return response
+
+    def _before(self):
+        if request.endpoint in EXEMPT_ENDPOINTS or request.method == 'OPTIONS':
+            return None
+        group = self.groups.get(ROUTE_GROUPS.get(request.endpoint, 'read'))
+        if group is None:
+            return None
+
+        with self._lock:
+            if group.shed_backlog and self.backlog() > self.max_backlog:
+                return self._reject(group, 'backlog', 503, self.retry_after)
+
+            wait = group.take_token(self._client(), time.monotonic())
+            if wait:
+                return self._reject(group, 'rate_limit', 429, max(1, math.ceil(wait)))
+
+            if group.concurrency and group.in_flight >= group.concurrency:
+                return self._reject(group, 'concurrency', 503, self.retry_after)
+
+            group.in_flight += 1
+            group.peak_in_flight = max(group.peak_in_flight, group.in_flight)
+            group.admitted += 1
+        g._admission_group = group
+        return None
+
+    def _teardown(self, exc):
+        group = g.pop('_admission_group', None)
+        if group is not None:
+            with self._lock:
+                group.in_flight -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "backlog": self.backlog(),
+                "maxBacklog": self.max_backlog,
+                "groups": {
+                    name: {
+                        "concurrencyLimit": group.concurrency,
+                        "rate": group.rate,
+                        "burst": group.burst,
+                        "shedOnBacklog": group.shed_backlog,
+                        "inFlight": group.in_flight,
+                        "peakInFlight": group.peak_in_flight,
+                        "admitted": group.admitted,
+                        "rejected": dict(group.rejected),
+                        "trackedClients": len(group.buckets),
+                    }
+                    for name, group in self.groups.items()
+                },
+            }
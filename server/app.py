@@ -1,23 +1,52 @@
 """Flask API for KYC workflow prototype"""
 
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response, stream_with_context
 from flask_cors import CORS
+from flask.json.provider import DefaultJSONProvider
 from mock_data import CASES, POLICIES, WORKFLOW
-import copy
+from audit_log import EventLog, utc_now
+from export import EXPORT_KINDS, iter_ndjson
+from ingestion import IngestionPool, expand_zip
+from scheduler import PriorityScheduler, case_priority
+from dedup import HashIndex, compute_fingerprints, duplicate_check, index_backlog
+from search_index import SearchIndex
+from profiling import RequestProfiler
+from compact_model import compact_cases, json_default
+from admission import AdmissionController
+from entity_resolution import EntityResolver
+from stats import DashboardStats
+from bank_statements import anomaly_check, statement_from_document
+from policy_rules import PolicyEngine
+from storage import FileTooLarge, OrphanSweeper, UploadStore, new_document_id
+import atexit
 import os
-import base64
-import random
+import threading
 import datetime
+import zipfile
+from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.utils import secure_filename
-import os
-import json
-from pydantic import BaseModel, Field
-from mistralai import Mistral
-from mistralai import Mistral, DocumentURLChunk, ImageURLChunk, ResponseFormat
-from mistralai.extra import response_format_from_pydantic_model
+from doc_intel import build_router_from_env
+
+class StoreJSONProvider(DefaultJSONProvider):
+    """JSON provider that serializes compact case records like the dicts they replace"""
+
+    @staticmethod
+    def default(o):
+        try:
+            return json_default(o)
+        except TypeError:
+            return DefaultJSONProvider.default(o)
+
 
 # Initialize Flask app
 app = Flask(__name__)
+app.json = StoreJSONProvider(app)
+
+# Behind a reverse proxy, trust X-Forwarded-For from this many proxy hops
+# (0 = not proxied: remote_addr is the peer address, used for rate limiting)
+PROXY_HOPS = int(os.environ.get('KYC_PROXY_FIX', '0'))
+if PROXY_HOPS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXY_HOPS)
 
 # Enable CORS for the Vite dev server (allow both common ports)
 CORS(app, origins=["http://localhost:5173", "http://localhost:5174"])
@@ -26,177 +55,268 @@ CORS(app, origins=["http://localhost:5173", "http://localhost:5174"])
 UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'doc', 'docx'}
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = 10 * 1024 * 1024  # 10MB max file size
-
-# Create upload folder if it doesn't exist
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
-
-# In-memory storage (copy to avoid modifying original mock data)
-cases_store = copy.deepcopy(CASES)
+MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB max file size
+MAX_ARCHIVE_SIZE = 100 * 1024 * 1024  # 100MB max uncompressed size of one ZIP upload
+app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB max request (bulk uploads)
+
+# Document processing: max documents classified / OCR'd concurrently, scheduled
+# by customer priority (see scheduler.case_priority)
+INGEST_WORKERS = int(os.environ.get('KYC_INGEST_WORKERS', '4'))
+STARVATION_SECONDS = float(os.environ.get('KYC_STARVATION_SECONDS', '30'))
+doc_scheduler = PriorityScheduler(workers=INGEST_WORKERS, max_wait=STARVATION_SECONDS)
+ingestion_pool = IngestionPool(doc_scheduler)
+
+# Admission control: per-route concurrency, per-client rate limits, and upload
+# shedding once the document-processing backlog passes KYC_MAX_BACKLOG
+admission = AdmissionController.from_env(backlog=doc_scheduler.pending)
+admission.init_app(app)
+
+# Opt-in request profiling (KYC_PROFILE=1); registers no hooks when disabled
+profiler = RequestProfiler.from_env()
+profiler.init_app(app)
+doc_scheduler.wrap = profiler.wrap_job
+
+# Document classification / OCR engines (see doc_intel.build_router_from_env)
+doc_router = build_router_from_env()
+
+# Uploaded files, hash-sharded under the upload folder (created if missing)
+upload_store = UploadStore(UPLOAD_FOLDER, depth=int(os.environ.get('KYC_UPLOAD_SHARD_DEPTH', '2')))
+
+# Audit log settings
+DATA_DIR = os.environ.get('KYC_DATA_DIR', 'data')
+SNAPSHOT_EVERY = int(os.environ.get('KYC_SNAPSHOT_EVERY', '1000'))
+
+# Keep cases as compact slotted records instead of nested dicts (KYC_COMPACT_STORE=0 to disable)
+COMPACT_STORE = os.environ.get('KYC_COMPACT_STORE', '1').lower() not in ('0', 'false')
+
+# In-memory storage, rebuilt from the latest snapshot plus the event log tail
+# (falls back to a copy of the mock data on first start)
+event_log = EventLog(DATA_DIR, snapshot_every=SNAPSHOT_EVERY,
+                     model=compact_cases if COMPACT_STORE else None)
+cases_store = event_log.recover(CASES)
+atexit.register(event_log.close)
+
+# Exact / perceptual hash index of every fingerprinted document, for reuse detection
+hash_index = HashIndex(max_distance=int(os.environ.get('KYC_PHASH_MAX_DISTANCE', '6')))
+for _case in cases_store:
+    for _doc in _case.get('documents', []):
+        if _doc.get('fingerprints'):
+            hash_index.add((_case['id'], _doc['id']), _doc['fingerprints'])
+event_log.subscribe(hash_index.on_event)
+backlog_scan = threading.Lock()
+
+# Full-text index over case customer fields and document OCR output
+search_index = SearchIndex()
+for _case in cases_store:
+    search_index.index_case(_case)
+event_log.subscribe(search_index.on_event)
+
+# Entity resolution: clusters of cases that refer to the same customer
+entity_resolver = EntityResolver()
+for _case in cases_store:
+    entity_resolver.add_case(_case)
+event_log.subscribe(entity_resolver.on_event)
+
+# Dashboard aggregates, updated per mutation with a periodic full recompute
+dashboard_stats = DashboardStats()
+dashboard_stats.rebuild(cases_store)
+event_log.subscribe(dashboard_stats.on_event)
+
+# Policy rules (POLICIES[*]["rules"]) compiled and evaluated over every case;
+# re-evaluated per case on mutation and in full periodically (time-based rules)
+policy_engine = PolicyEngine(POLICIES)
+policy_engine.rebuild(cases_store)
+event_log.subscribe(policy_engine.on_event)
+
+def live_upload_paths():
+    """File paths of every current document"""
+    return [doc.get('file_path') for case in list(cases_store) for doc in case.get('documents', [])]
+
+
+# Background reclamation of upload files no document refers to any more;
+# paused while document processing has a backlog
+upload_sweeper = OrphanSweeper(
+    upload_store,
+    live_paths=live_upload_paths,
+    busy=lambda: doc_scheduler.pending() > 0,
+    interval=int(os.environ.get('KYC_SWEEP_INTERVAL_SECONDS', '3600')),
+    min_age=int(os.environ.get('KYC_SWEEP_MIN_AGE_SECONDS', '3600')),
+    scan_rate=int(os.environ.get('KYC_SWEEP_SCAN_RATE', '200')),
+    delete_rate=int(os.environ.get('KYC_SWEEP_DELETE_RATE', '20')),
+)
+
+# Periodic background work runs only in the process serving requests. Under
+# `python app.py` (debug=True) the Werkzeug reloader's watcher process runs
+# this module too, with a copy of the store frozen at startup: a sweeper
+# there would delete every file uploaded to the real server.
+SERVING_PROCESS = __name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'
+if SERVING_PROCESS:
+    dashboard_stats.start_recompute(cases_store, interval=int(os.environ.get('KYC_STATS_RECOMPUTE_SECONDS', '300')))
+    policy_engine.start_refresh(interval=int(os.environ.get('KYC_POLICY_REFRESH_SECONDS', '300')))
+    upload_sweeper.start()
 
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-def classify_document_type(file_path, file_type):
-    """
-    Classify document type using Mistral VLM
-    This is a placeholder for your Mistral VLM implementation
-    """
-    # TODO: Implement your Mistral VLM classification here
-    # This is dummy code as requested
-    
-    import random
-    
-    # Dummy classification logic - replace with your Mistral VLM implementation
-    document_types = [
-        "Employment Pass",
-        "Passport", 
-        "Bank Statement",
-        "Billing Form",
-        "Employment Letter"
-    ]
-    api_key = 'ZjM0pTT7sc11IrX80ZSXrXrrwI97fSGG'
-
-    client = Mistral(api_key=api_key)
+def classify_document_type(file_path, file_type, filename=None):
+    """Classify document type using the configured document-intelligence backend"""
+    classification_result = doc_router.classify(file_path, file_type, filename)
+    print(f"Document classified as: {classification_result['document_type']} with confidence: {classification_result['confidence']} ({classification_result['backend']})")
+    return classification_result
 
-    uploaded_pdf = client.files.upload(
-        file={
-            "file_name": file_path,
-            "content": open(file_path, "rb"),
-        },
-        purpose="ocr"
-    )  
-
-    signed_url = client.files.get_signed_url(file_id=uploaded_pdf.id)
-
-    model = "mistral-small-latest"
-
-
-    # Define the messages for the chat
-    messages = [
-        {
-            "role": "user",
-            "content": [
-                {
-                    "type": "text",
-                    "text": f"What is the type of this document? Response in a JSON format with key as document_type and a value between {document_types}"
-                },
-                {
-                    "type": "image_url",
-                    "image_url": signed_url.url
-                }
-            ]
-        }
-    ]
 
-    # Get the chat response
-    chat_response = client.chat.complete(
-        model=model,
-        messages=messages,
-        response_format=      {
-            "type": "json_object"
-        }
-    )
+def process_document_with_ocr(file_path, file_type, filename=None):
+    """Process document with OCR using the configured document-intelligence backend"""
+    return doc_router.ocr(file_path, file_type, filename)
 
-    document_type = json.loads(chat_response.choices[0].message.content)['document_type']
 
-    # Simulate classification with confidence scores
-    classification_result = {
-        "document_type": document_type,
-        "confidence": round(random.uniform(0.85, 0.99), 2),
-        "alternative_types": [
-            {
-                "type": document_type,
-                "confidence": round(random.uniform(0.10, 0.30), 2)
-            }
-        ],
-        "classification_status": "completed"
-    }
-    
-    print(f"Document classified as: {classification_result['document_type']} with confidence: {classification_result['confidence']}")
-    
-    return classification_result
+def generate_document_id(taken=()):
+    """Generate a document ID not present in ``taken``"""
+    while True:
+        doc_id = new_document_id()
+        if doc_id not in taken:
+            return doc_id
 
 
-def process_document_with_ocr(file_path, file_type):
+def save_upload(case_id, doc_id, filename, content):
     """
-    Process document with OCR using Mistral API
-    This is a placeholder for Mistral API integration
+    Write an uploaded file (a FileStorage, stream or raw bytes) to the upload
+    store. Returns (file_path, file_extension, size); raises FileTooLarge
+    (a ValueError) if too large.
     """
-    # TODO: Implement Mistral API call here
-    # For now, return mock OCR results
+    file_extension = secure_filename(filename).rsplit('.', 1)[1].lower()
+    try:
+        file_path, size = upload_store.save(case_id, doc_id, file_extension, content, max_size=MAX_FILE_SIZE)
+    except FileTooLarge:
+        raise FileTooLarge(f"{filename} exceeds the {MAX_FILE_SIZE // (1024 * 1024)}MB file size limit")
+    return file_path, file_extension, size
+
 
+def build_document(doc_id, name, doc_type, category, size, file_path, file_extension):
+    """Classify and OCR a saved file and return its document entry"""
+    # Step 1: Classify document type using Mistral VLM (or the configured backend)
+    classification_result = classify_document_type(file_path, file_extension, name)
     
-    # Here you would:
-    # 1. Read the file content
-    # 2. Convert to base64 if needed for API
-    # 3. Call Mistral API endpoint
-    # 4. Process and return results
+    # Step 2: Process with OCR using Mistral OCR (or the configured backend)
+    ocr_result = process_document_with_ocr(file_path, file_extension, name)
+    
+    # Step 3: Exact and perceptual page hashes for duplicate detection
+    try:
+        fingerprints = compute_fingerprints(file_path)
+    except Exception as e:
+        print(f"Error fingerprinting document: {e}")
+        fingerprints = None
+    
+    # Create document entry with classification
+    return {
+        "id": doc_id,
+        "name": name,
+        "type": doc_type,
+        "size": int(size),
+        "uploadedAt": datetime.datetime.now().isoformat() + 'Z',
+        "status": "Pending Review",
+        "category": category,
+        "file_path": file_path,
+        "ocr_result": ocr_result,  # Store OCR results
+        "classification": classification_result,  # Store classification results
+        "fingerprints": fingerprints  # Page hashes for duplicate detection
+    }
 
 
+def flag_reused_documents(case_id, documents):
+    """Index new documents and add a check to the case for any reused from other cases"""
+    for doc in documents:
+        if not doc.get('fingerprints'):
+            continue
+        matches = hash_index.add_and_match((case_id, doc['id']), doc['fingerprints'])
+        if matches:
+            event_log.record('CheckAdded', case_id, {"check": duplicate_check(doc['id'], matches)})
 
 
-    api_key = 'ZjM0pTT7sc11IrX80ZSXrXrrwI97fSGG'
+def extract_bank_statements(case_id, documents):
+    """Fill in bankStatements from OCR'd statements and flag anomalous transactions"""
+    case = next((c for c in cases_store if c['id'] == case_id), None)
+    if case is None:
+        return
+    annual_income = (case.get('occupationForm') or {}).get('annualIncome')
+    for doc in documents:
+        try:
+            statement = statement_from_document(doc, annual_income)
+        except Exception as e:
+            print(f"Error extracting bank statement {doc['id']}: {e}")
+            continue
+        if statement is None:
+            continue
+        event_log.record('BankStatementExtracted', case_id, {"statement": statement})
+        check = anomaly_check(statement)
+        if check:
+            event_log.record('CheckAdded', case_id, {"check": check})
 
-    client = Mistral(api_key=api_key)
 
-    uploaded_pdf = client.files.upload(
-        file={
-            "file_name": file_path,
-            "content": open(file_path, "rb"),
-        },
-        purpose="ocr"
-    )  
+def status_after_upload(case, added_count):
+    """Move the case to Intake if it's in Ingestion phase and will have enough documents"""
+    if case['status'] == 'Ingestion' and len(case.get('documents', [])) + added_count >= 2:
+        return 'Intake'
+    return case['status']
 
-    signed_url = client.files.get_signed_url(file_id=uploaded_pdf.id)
 
+@app.route('/api/health', methods=['GET'])
+def health_check():
+    """Health check endpoint"""
+    return jsonify({"ok": True})
 
 
-    # Document Annotation response format
-    class Document(BaseModel):
-        Name: str
-        Occupation: str
-        FIN: str
-        date_of_application: str
-        date_of_issue: str
-        date_of_expiry: str
+@app.route('/api/doc-intel/stats', methods=['GET'])
+def get_doc_intel_stats():
+    """Get per-backend call counts and latency for classification and OCR"""
+    return jsonify(doc_router.stats.to_dict())
 
-    class Image(BaseModel):
-        image_type: str = Field(..., description="The type of the image.")
-        smiling: str = Field(..., description="Whether the person on the image smiling or not")
-        fraud: str = Field(..., description="Whether the document looks like it has been forged.")
 
+@app.route('/api/scheduler/stats', methods=['GET'])
+def get_scheduler_stats():
+    """Get document-processing queue depth and wait times per priority class"""
+    return jsonify(doc_scheduler.stats())
 
-    # Client call
-    response = client.ocr.process(
-        model="mistral-ocr-latest",
-        pages=list(range(8)),
-        document={
-            "type": "document_url",
-            "document_url": signed_url.url,
-        },
-        bbox_annotation_format=response_format_from_pydantic_model(Image),
-        document_annotation_format=response_format_from_pydantic_model(Document),
-        include_image_base64=True
-    )
 
-    ocr_result = json.loads(response.document_annotation)
+@app.route('/api/admission/stats', methods=['GET'])
+def get_admission_stats():
+    """Get admission-control limits, in-flight counts and rejections per route group"""
+    return jsonify(admission.stats())
 
-    ocr_result['extracted_text'] = "Mock OCR text extracted from document"
-    ocr_result['confidence'] = 0.95
-    ocr_result['processing_status'] = "completed"
 
-    print(ocr_result)
-    return ocr_result
+@app.route('/api/debug/slow-requests', methods=['GET'])
+def list_slow_requests():
+    """List recent slow or explicitly profiled requests"""
+    if not profiler.enabled:
+        return jsonify({"error": "profiling_disabled"}), 404
+    return jsonify(profiler.list())
 
 
-@app.route('/api/health', methods=['GET'])
-def health_check():
-    """Health check endpoint"""
-    return jsonify({"ok": True})
+@app.route('/api/debug/slow-requests/<int:capture_id>', methods=['GET'])
+def get_slow_request(capture_id):
+    """Get a captured profile; ?format=collapsed returns flamegraph-ready stacks"""
+    if not profiler.enabled:
+        return jsonify({"error": "profiling_disabled"}), 404
+    capture = profiler.get(capture_id)
+    if not capture:
+        return jsonify({"error": "not_found"}), 404
+    if request.args.get('format') == 'collapsed':
+        return Response(profiler.collapsed_text(capture), mimetype='text/plain')
+    return jsonify(capture)
+
+
+@app.route('/api/storage/stats', methods=['GET'])
+def get_storage_stats():
+    """Get upload sweeper progress and reclaimed space"""
+    return jsonify(upload_sweeper.stats())
+
+
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    """Get dashboard aggregates (counts by status/stage/tier, risk histogram, pending reviews)"""
+    return jsonify(dashboard_stats.to_dict())
 
 
 @app.route('/api/workflow', methods=['GET'])
@@ -211,6 +331,25 @@ def get_cases():
     return jsonify(cases_store)
 
 
+@app.route('/api/export/<kind>', methods=['GET'])
+def export_records(kind):
+    """Stream cases, documents, bank-statements or checks as NDJSON"""
+    if kind not in EXPORT_KINDS:
+        return jsonify({"error": "invalid export kind", "kinds": list(EXPORT_KINDS)}), 400
+    
+    # Optional filters: ?status=A&status=B&from=2025-01-01&to=2025-02-01
+    filters = {
+        "status": request.args.getlist('status') or None,
+        "created_from": request.args.get('from'),
+        "created_to": request.args.get('to')
+    }
+    
+    return Response(
+        stream_with_context(iter_ndjson(cases_store, kind, **filters)),
+        mimetype='application/x-ndjson'
+    )
+
+
 @app.route('/api/cases/<case_id>', methods=['GET'])
 def get_case(case_id):
     """Get a specific case by ID"""
@@ -232,7 +371,50 @@ def search_policies():
         policy for policy in POLICIES
         if query in policy['title'].lower() or query in policy['clause'].lower()
     ]
-    return jsonify(matching_policies)
+    # Compiled rules are served by /api/policies/violations, not here
+    return jsonify([{k: v for k, v in policy.items() if k != 'rules'} for policy in matching_policies])
+
+
+@app.route('/api/policies/violations', methods=['GET'])
+def list_policy_violations():
+    """List cases violating policy rules, optionally for one policy (?policy=POL-002)"""
+    limit = min(request.args.get('limit', 50, type=int), 500)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    total, counts, page = policy_engine.violations(request.args.get('policy'), limit, offset)
+    return jsonify({
+        "total": total,
+        "byRule": counts,
+        "cases": page,
+        "evaluation": policy_engine.stats()
+    })
+
+
+@app.route('/api/search', methods=['GET'])
+def search_documents():
+    """Full-text search over case and document fields, e.g. ?q=FIN:G1234567N or ?q=name:joh*"""
+    query = request.args.get('q', '')
+    if not query.strip():
+        return jsonify({"total": 0, "hits": []})
+    
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    total, hits = search_index.search(query, limit=limit, offset=offset)
+    
+    # Attach display fields for each hit
+    for hit in hits:
+        case = event_log.get_case(hit['caseId'])
+        if not case:
+            continue
+        hit['customerName'] = case['customer']['name']
+        hit['caseStatus'] = case['status']
+        if hit['documentId']:
+            doc = next((d for d in case.get('documents', []) if d['id'] == hit['documentId']), None)
+            if doc:
+                hit['documentName'] = doc.get('name')
+                hit['ocr'] = {k: v for k, v in (doc.get('ocr_result') or {}).items()
+                              if k in ('Name', 'Occupation', 'FIN')}
+    
+    return jsonify({"total": total, "hits": hits})
 
 
 @app.route('/api/cases/<case_id>/decision', methods=['POST'])
@@ -255,16 +437,19 @@ def post_decision(case_id):
     if decision not in ['Approve', 'Reject', 'Pending']:
         return jsonify({"error": "invalid decision"}), 400
     
-    # Update case status based on decision
+    # Work out the new case status; for 'Pending', keep current status
+    status = case['status']
     if decision == 'Approve':
-        case['status'] = 'Approved'
+        status = 'Approved'
     elif decision == 'Reject':
-        case['status'] = 'Rejected'
-    # For 'Pending', keep current status
+        status = 'Rejected'
     
-    # Store the decision note if provided
-    if note:
-        case['decisionNote'] = note
+    # Apply and record the decision (note is stored only if provided)
+    event_log.record('DecisionRecorded', case_id, {
+        "decision": decision,
+        "status": status,
+        "note": note
+    }, actor=data.get('decidedBy'))
     
     return jsonify({
         "ok": True,
@@ -303,12 +488,14 @@ def review_bank_statement(case_id, statement_id):
     if review_status not in ['Approved', 'Rejected', 'Under Review', 'Pending Review']:
         return jsonify({"error": "invalid reviewStatus"}), 400
     
-    # Update the bank statement review
-    statement['reviewStatus'] = review_status
-    statement['reviewedBy'] = reviewer
-    statement['reviewDate'] = data.get('reviewDate', '2025-01-09T12:00:00Z')
-    if notes:
-        statement['notes'] = notes
+    # Apply and record the bank statement review
+    event_log.record('BankStatementReviewed', case_id, {
+        "statementId": statement_id,
+        "reviewStatus": review_status,
+        "reviewedBy": reviewer,
+        "reviewDate": data.get('reviewDate') or utc_now(),
+        "notes": notes
+    }, actor=reviewer)
     
     return jsonify({
         "ok": True,
@@ -344,13 +531,13 @@ def review_occupation_form(case_id):
     if review_status not in ['Approved', 'Rejected', 'Pending Review', 'Additional Info Required']:
         return jsonify({"error": "invalid reviewStatus"}), 400
     
-    # Update the occupation form review
-    case['occupationForm']['reviewStatus'] = review_status
-    case['occupationForm']['reviewedBy'] = reviewer
-    case['occupationForm']['reviewDate'] = data.get('reviewDate', '2025-01-09T12:00:00Z')
-    
-    if verification_docs:
-        case['occupationForm']['verificationDocuments'] = verification_docs
+    # Apply and record the occupation form review
+    event_log.record('OccupationFormReviewed', case_id, {
+        "reviewStatus": review_status,
+        "reviewedBy": reviewer,
+        "reviewDate": data.get('reviewDate') or utc_now(),
+        "verificationDocuments": verification_docs
+    }, actor=reviewer)
     
     return jsonify({
         "ok": True,
@@ -360,6 +547,53 @@ def review_occupation_form(case_id):
     })
 
 
+@app.route('/api/cases/<case_id>/violations', methods=['GET'])
+def get_case_violations(case_id):
+    """Get the policy rules a case currently violates"""
+    violations = policy_engine.case_violations(case_id)
+    if violations is None:
+        return jsonify({"error": "case_not_found"}), 404
+    return jsonify({"caseId": case_id, "violations": violations})
+
+
+@app.route('/api/cases/<case_id>/linked', methods=['GET'])
+def get_linked_cases(case_id):
+    """Get other cases resolved to the same customer"""
+    case = event_log.get_case(case_id)
+    if not case:
+        return jsonify({"error": "case_not_found"}), 404
+    
+    cluster_id, linked_ids = entity_resolver.cluster(case_id)
+    linked = []
+    for other_id in linked_ids:
+        other = event_log.get_case(other_id)
+        if not other:
+            continue
+        evidence = entity_resolver.evidence(case_id, other_id)
+        linked.append({
+            "caseId": other_id,
+            "customerName": other['customer']['name'],
+            "status": other['status'],
+            "riskScore": other.get('riskScore'),
+            "direct": evidence is not None,
+            "score": evidence[0] if evidence else None,
+            "reasons": evidence[1] if evidence else []
+        })
+    
+    return jsonify({"caseId": case_id, "clusterId": cluster_id, "linked": linked})
+
+
+@app.route('/api/cases/<case_id>/history', methods=['GET'])
+def get_case_history(case_id):
+    """Get the audit trail of recorded changes for a case"""
+    case = next((c for c in cases_store if c['id'] == case_id), None)
+    if not case:
+        return jsonify({"error": "case_not_found"}), 404
+    
+    limit = request.args.get('limit', type=int)
+    return jsonify(event_log.history(case_id, limit=limit))
+
+
 @app.route('/api/cases/<case_id>/documents', methods=['GET'])
 def get_documents(case_id):
     """Get all documents for a case"""
@@ -399,46 +633,32 @@ def upload_document(case_id):
     category = request.form.get('category', 'Other')
     size = request.form.get('size', '0')
     
-    # Generate unique filename
-    doc_id = f"DOC-{random.randint(100, 999)}"
-    filename = secure_filename(file.filename)
-    file_extension = filename.rsplit('.', 1)[1].lower()
-    unique_filename = f"{case_id}_{doc_id}.{file_extension}"
-    file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-    
-    # Save the file
-    file.save(file_path)
-    
-    # Step 1: Classify document type using Mistral VLM
-    classification_result = classify_document_type(file_path, file_extension)
-    
-    # Step 2: Process with OCR (placeholder for Mistral API)
-    ocr_result = process_document_with_ocr(file_path, file_extension)
-    
-    # Create document entry with classification
-    new_doc = {
-        "id": doc_id,
-        "name": name,
-        "type": doc_type,
-        "size": int(size),
-        "uploadedAt": datetime.datetime.now().isoformat() + 'Z',
-        "status": "Pending Review",
-        "category": category,
-        "file_path": file_path,
-        "ocr_result": ocr_result,  # Store OCR results
-        "classification": classification_result  # Store classification results
-    }
-    
-    # Initialize documents array if it doesn't exist
-    if 'documents' not in case:
-        case['documents'] = []
-    
-    # Add the new document
-    case['documents'].append(new_doc)
-    
-    # Update case status if it's in Ingestion phase and has enough documents
-    if case['status'] == 'Ingestion' and len(case['documents']) >= 2:
-        case['status'] = 'Intake'
+    # Generate unique filename and save the file
+    doc_id = generate_document_id({doc['id'] for doc in case.get('documents', [])})
+    try:
+        file_path, file_extension, _ = save_upload(case_id, doc_id, file.filename, file)
+    except ValueError as e:
+        return jsonify({"error": "file too large", "details": str(e)}), 413
+    
+    # Classify and OCR the document on the priority scheduler
+    try:
+        new_doc = doc_scheduler.submit(
+            case_priority(case), build_document,
+            doc_id, name, doc_type, category, size, file_path, file_extension
+        ).result()
+    except Exception:
+        upload_sweeper.release(file_path)
+        raise
+    ocr_result = new_doc["ocr_result"]
+    classification_result = new_doc["classification"]
+    
+    # Add the new document (applied and recorded through the event log)
+    event_log.record('DocumentAdded', case_id, {
+        "document": new_doc,
+        "caseStatus": status_after_upload(case, 1)
+    })
+    flag_reused_documents(case_id, [new_doc])
+    extract_bank_statements(case_id, [new_doc])
     
     return jsonify({
         "ok": True,
@@ -470,6 +690,128 @@ def upload_document(case_id):
     })
 
 
+@app.route('/api/cases/<case_id>/documents/bulk', methods=['POST'])
+def bulk_upload_documents(case_id):
+    """Upload many documents (or a ZIP archive) for a case and process them in parallel"""
+    # Find the case
+    case = next((c for c in cases_store if c['id'] == case_id), None)
+    if not case:
+        return jsonify({"error": "case_not_found"}), 404
+    
+    uploads = [f for f in request.files.getlist('files') + request.files.getlist('file') if f.filename]
+    if not uploads:
+        return jsonify({"error": "no file provided"}), 400
+    
+    # Shared form data applied to every file
+    doc_type = request.form.get('type', 'Unknown')
+    category = request.form.get('category', 'Other')
+    
+    # Validate file types and archive directories before saving anything
+    sources = []
+    try:
+        for upload in uploads:
+            if upload.filename.lower().endswith('.zip'):
+                sources.append(expand_zip(upload.stream, allowed_file, max_file_size=MAX_FILE_SIZE,
+                                          max_total_size=MAX_ARCHIVE_SIZE))
+            elif allowed_file(upload.filename):
+                sources.append([(upload.filename, upload)])
+            else:
+                return jsonify({"error": "file type not allowed", "file": upload.filename}), 400
+    except (ValueError, zipfile.BadZipFile) as e:
+        return jsonify({"error": "invalid archive", "details": str(e)}), 400
+    
+    # Save every file up front (request streams are gone once we return);
+    # archive entries are decompressed straight to disk one at a time
+    taken = {doc['id'] for doc in case.get('documents', [])}
+    items = []
+    try:
+        for source in sources:
+            for filename, content in source:
+                doc_id = generate_document_id(taken)
+                taken.add(doc_id)
+                file_path, file_extension, size = save_upload(case_id, doc_id, filename, content)
+                items.append({
+                    "name": filename,
+                    "doc_id": doc_id,
+                    "file_path": file_path,
+                    "file_extension": file_extension,
+                    "size": size
+                })
+    except (ValueError, zipfile.BadZipFile) as e:
+        for item in items:
+            upload_sweeper.release(item["file_path"])
+        if isinstance(e, FileTooLarge):
+            return jsonify({"error": "file too large", "details": str(e)}), 413
+        return jsonify({"error": "invalid archive", "details": str(e)}), 400
+    if not items:
+        return jsonify({"error": "no supported files in upload"}), 400
+    
+    def process(item):
+        return build_document(item["doc_id"], item["name"], doc_type, category,
+                              item["size"], item["file_path"], item["file_extension"])
+    
+    def finalize(batch, documents):
+        # Files whose processing failed will never be referenced
+        processed = {doc['id'] for doc in documents}
+        for item in items:
+            if item["doc_id"] not in processed:
+                upload_sweeper.release(item["file_path"])
+        
+        # Add all documents and update the case status in a single event
+        if not documents:
+            return case['status']
+        event_log.record('DocumentsIngested', case_id, {
+            "batchId": batch.id,
+            "documents": documents,
+            "caseStatus": status_after_upload(case, len(documents))
+        })
+        flag_reused_documents(case_id, documents)
+        extract_bank_statements(case_id, documents)
+        return case['status']
+    
+    batch = ingestion_pool.submit(case_id, items, process, finalize, priority=case_priority(case))
+    
+    # ?wait=1 blocks until the whole batch is processed
+    if request.args.get('wait', '').lower() in ('1', 'true'):
+        batch.done.wait(timeout=request.args.get('timeout', 300, type=float))
+        return jsonify(batch.to_dict()), 200 if batch.done.is_set() else 202
+    return jsonify(batch.to_dict()), 202
+
+
+@app.route('/api/ingest/<batch_id>', methods=['GET'])
+def get_ingest_batch(batch_id):
+    """Get per-file progress and outcome of a bulk upload"""
+    batch = ingestion_pool.get(batch_id)
+    if not batch:
+        return jsonify({"error": "batch_not_found"}), 404
+    return jsonify(batch.to_dict())
+
+
+@app.route('/api/dedup/scan-uploads', methods=['POST'])
+def scan_upload_backlog():
+    """Fingerprint and index existing files in the uploads folder in the background"""
+    def on_match(case_id, doc_id, fingerprints, matches):
+        if any(c['id'] == case_id for c in cases_store):
+            event_log.record('CheckAdded', case_id, {"check": duplicate_check(doc_id, matches)})
+    
+    if not backlog_scan.acquire(blocking=False):
+        return jsonify({"error": "scan_in_progress"}), 409
+
+    def scan():
+        try:
+            # Orphaned files (deleted documents, failed uploads) are skipped
+            indexed, flagged = index_backlog(hash_index, app.config['UPLOAD_FOLDER'], on_match,
+                                             live_upload_paths())
+        finally:
+            backlog_scan.release()
+        print(f"Upload backlog indexed: {indexed} files, {flagged} reused across cases")
+        return {"indexed": indexed, "flagged": flagged}
+    
+    # Backlog work runs at the lowest priority so live uploads go first
+    doc_scheduler.submit('standard', scan)
+    return jsonify({"ok": True, "status": "scanning", "indexedDocuments": len(hash_index)}), 202
+
+
 @app.route('/api/cases/<case_id>/documents/<doc_id>', methods=['DELETE'])
 def delete_document(case_id, doc_id):
     """Delete a document from a case"""
@@ -485,15 +827,11 @@ def delete_document(case_id, doc_id):
     if not doc_to_delete:
         return jsonify({"error": "document_not_found"}), 404
     
-    # Delete the actual file if it exists
-    if 'file_path' in doc_to_delete and os.path.exists(doc_to_delete['file_path']):
-        try:
-            os.remove(doc_to_delete['file_path'])
-        except Exception as e:
-            print(f"Error deleting file: {e}")
+    # Remove from documents list (applied and recorded through the event log)
+    event_log.record('DocumentDeleted', case_id, {"documentId": doc_id})
     
-    # Remove from documents list
-    case['documents'] = [doc for doc in documents if doc['id'] != doc_id]
+    # The file itself is reclaimed by the background sweeper
+    upload_sweeper.release(doc_to_delete.get('file_path'))
     
     return jsonify({
         "ok": True,
@@ -0,0 +1,386 @@
+"""Append-only audit log for case mutations with snapshot replay"""
+
+import bisect
+import copy
+import datetime
+import json
+import os
+import threading
+import time
+
+from compact_model import json_default
+
+
+def utc_now():
+    """Current UTC time as an ISO-8601 string with a trailing Z"""
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None).isoformat() + 'Z'
+
+
+def _find(items, item_id):
+    return next((item for item in items or [] if item.get('id') == item_id), None)
+
+
+# Event appliers: each one takes the case dict and the event payload and
+# mutates the case in place. Routes go through these (via EventLog.record)
+# so that live updates and startup replay share the exact same code path.
+
+def _apply_decision(case, payload):
+    if payload.get('status'):
+        case['status'] = payload['status']
+    if payload.get('note'):
+        case['decisionNote'] = payload['note']
+
+
+def _apply_bank_statement_review(case, payload):
+    statement = _find(case.get('bankStatements'), payload['statementId'])
+    if statement is None:
+        return
+    statement['reviewStatus'] = payload['reviewStatus']
+    statement['reviewedBy'] = payload['reviewedBy']
+    statement['reviewDate'] = payload['reviewDate']
+    if payload.get('notes'):
+        statement['notes'] = payload['notes']
+
+
+def _apply_bank_statement_extracted(case, payload):
+    statements = case.setdefault('bankStatements', [])
+    statement = copy.deepcopy(payload['statement'])
+    for i, existing in enumerate(statements):
+        if existing.get('id') == statement['id']:
+            statements[i] = statement
+            return
+    statements.append(statement)
+
+
+def _apply_occupation_form_review(case, payload):
+    form = case.get('occupationForm')
+    if not form:
+        return
+    form['reviewStatus'] = payload['reviewStatus']
+    form['reviewedBy'] = payload['reviewedBy']
+    form['reviewDate'] = payload['reviewDate']
+    if payload.get('verificationDocuments'):
+        form['verificationDocuments'] = payload['verificationDocuments']
+
+
+def _apply_document_added(case, payload):
+    case.setdefault('documents', []).append(copy.deepcopy(payload['document']))
+    if payload.get('caseStatus'):
+        case['status'] = payload['caseStatus']
+
+
+def _apply_documents_ingested(case, payload):
+    case.setdefault('documents', []).extend(copy.deepcopy(payload['documents']))
+    if payload.get('caseStatus'):
+        case['status'] = payload['caseStatus']
+
+
+def _apply_check_added(case, payload):
+    case.setdefault('checks', []).append(copy.deepcopy(payload['check']))
+
+
+def _apply_document_deleted(case, payload):
+    doc_id = payload['documentId']
+    case['documents'] = [doc for doc in case.get('documents', []) if doc['id'] != doc_id]
+    # Statements extracted from the document and checks raised on it go with it
+    if any(s.get('documentId') == doc_id for s in case.get('bankStatements') or []):
+        case['bankStatements'] = [s for s in case['bankStatements'] if s.get('documentId') != doc_id]
+    if any(c.get('documentId') == doc_id for c in case.get('checks') or []):
+        case['checks'] = [c for c in case['checks'] if c.get('documentId') != doc_id]
+
+
+EVENT_APPLIERS = {
+    'DecisionRecorded': _apply_decision,
+    'BankStatementReviewed': _apply_bank_statement_review,
+    'BankStatementExtracted': _apply_bank_statement_extracted,
+    'OccupationFormReviewed': _apply_occupation_form_review,
+    'DocumentAdded': _apply_document_added,
+    'DocumentsIngested': _apply_documents_ingested,
+    'DocumentDeleted': _apply_document_deleted,
+    'CheckAdded': _apply_check_added,
+}
+
+
+def apply_event(cases_by_id, event):
+    """Apply a single event to the case it targets"""
+    case = cases_by_id.get(event['caseId'])
+    applier = EVENT_APPLIERS.get(event['type'])
+    if case is None or applier is None:
+        return None
+    applier(case, event['payload'])
+    return case
+
+
+class EventLog:
+    """
+    Append-only JSON-lines event log with group-committed fsyncs.
+
+    Every mutation is written as one line to ``events.log``. Writes are
+    flushed to the OS immediately but fsynced in batches: whenever
+    ``fsync_batch`` events are pending or ``fsync_interval`` seconds have
+    passed since the last sync, whichever comes first. A background thread
+    covers the interval case so a quiet server still reaches disk.
+
+    Every ``snapshot_every`` events the full case store is written to
+    ``snapshot.json`` (atomically, via temp file + rename) together with
+    the log offset it covers and the per-case offset index. Recovery loads
+    the snapshot and replays only the log tail after that offset.
+
+    Snapshots are written by a background thread so writers never wait for
+    a full serialization: cases are encoded in chunks of ``snapshot_chunk``,
+    each under the lock, and the snapshot records for every case the log
+    offset its encoding already covers. Replay skips a case's events below
+    that offset, so the chunks need not share a single point in time.
+    """
+
+    def __init__(self, data_dir, fsync_batch=32, fsync_interval=0.05, snapshot_every=1000,
+                 model=None, snapshot_chunk=500):
+        self.data_dir = data_dir
+        self.model = model
+        self.log_path = os.path.join(data_dir, 'events.log')
+        self.snapshot_path = os.path.join(data_dir, 'snapshot.json')
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self.snapshot_every = snapshot_every
+        self.snapshot_chunk = snapshot_chunk
+
+        self._lock = threading.RLock()
+        self._snapshot_lock = threading.Lock()  # one snapshot (and .tmp file) at a time
+        self._file = None
+        self._seq = 0
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._since_snapshot = 0
+        self._index = {}  # caseId -> [byte offsets of that case's events]
+        self._cases = None
+        self._cases_by_id = {}
+        self._stop = threading.Event()
+        self._flusher = None
+        self._snapshotter = None
+        self._listeners = []
+
+    # Recovery ---------------------------------------------------------
+
+    def recover(self, initial_cases):
+        """
+        Rebuild the case store from the latest snapshot plus the log tail.
+
+        ``initial_cases`` is used as the base state when no snapshot exists
+        yet. If the log was created with a ``model``, it converts the loaded
+        list of case dicts (e.g. to compact records) before the tail is
+        replayed. Returns the recovered list of cases; subsequent calls to
+        ``record`` mutate that same list.
+        """
+        os.makedirs(self.data_dir, exist_ok=True)
+        offset, replayed = self._load(initial_cases, repair=True)
+        self._since_snapshot = replayed
+        self._file = open(self.log_path, 'ab')
+        self._start_flusher()
+        print(f"Event log recovered: snapshot offset {offset}, replayed {replayed} events")
+        return self._cases
+
+    def load_readonly(self, initial_cases):
+        """
+        Rebuild the case store like ``recover`` without writing anything:
+        the log is never truncated or opened for append, and an incomplete
+        last line (e.g. one the server is still writing) is simply ignored.
+        """
+        self._load(initial_cases, repair=False)
+        return self._cases
+
+    def _load(self, initial_cases, repair):
+        offset = 0
+        case_offsets = {}
+        cases = copy.deepcopy(initial_cases)
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            cases = snapshot['cases']
+            offset = snapshot['offset']
+            case_offsets = snapshot.get('caseOffsets', {})
+            self._seq = snapshot['seq']
+            self._index = {k: list(v) for k, v in snapshot['index'].items()}
+            del snapshot
+        if self.model is not None:
+            cases = self.model(cases)
+
+        self._cases = cases
+        self._cases_by_id = {c['id']: c for c in cases}
+
+        replayed = 0
+        if os.path.exists(self.log_path):
+            with open(self.log_path, 'rb') as f:
+                f.seek(offset)
+                while True:
+                    line_offset = f.tell()
+                    line = f.readline()
+                    if not line:
+                        break
+                    if not line.endswith(b'\n'):
+                        # Torn write from a crash: drop the partial record
+                        if repair:
+                            self._truncate(line_offset)
+                        break
+                    event = json.loads(line)
+                    # Cases snapshotted after this event already include it
+                    if line_offset >= case_offsets.get(event['caseId'], 0):
+                        apply_event(self._cases_by_id, event)
+                    self._index.setdefault(event['caseId'], []).append(line_offset)
+                    self._seq = event['seq']
+                    replayed += 1
+        return offset, replayed
+
+    def _truncate(self, offset):
+        with open(self.log_path, 'r+b') as f:
+            f.truncate(offset)
+
+    # Writing ----------------------------------------------------------
+
+    def subscribe(self, listener):
+        """
+        Call ``listener(event, case)`` after every recorded event has been
+        applied, so derived indexes can update incrementally. Listeners are
+        not called during recovery; build them from the recovered store.
+        """
+        self._listeners.append(listener)
+
+    def record(self, event_type, case_id, payload, actor=None):
+        """Apply a mutation to the in-memory store and append it to the log"""
+        with self._lock:
+            self._seq += 1
+            event = {
+                'seq': self._seq,
+                'ts': utc_now(),
+                'type': event_type,
+                'caseId': case_id,
+                'actor': actor,
+                'payload': payload,
+            }
+            case = apply_event(self._cases_by_id, event)
+
+            line = (json.dumps(event, separators=(',', ':'), default=json_default) + '\n').encode('utf-8')
+            offset = self._file.tell()
+            self._file.write(line)
+            self._file.flush()
+            self._index.setdefault(case_id, []).append(offset)
+
+            self._pending += 1
+            if (self._pending >= self.fsync_batch
+                    or time.monotonic() - self._last_sync >= self.fsync_interval):
+                self._sync()
+
+            for listener in self._listeners:
+                try:
+                    listener(event, case)
+                except Exception as e:
+                    print(f"Error in event listener {listener}: {e}")
+
+            self._since_snapshot += 1
+            if self._since_snapshot >= self.snapshot_every:
+                self._start_snapshot()
+            return event, case
+
+    def _sync(self):
+        if self._pending:
+            os.fsync(self._file.fileno())
+            self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def _start_flusher(self):
+        def run():
+            while not self._stop.wait(self.fsync_interval):
+                with self._lock:
+                    if self._file and self._pending:
+                        self._sync()
+
+        self._flusher = threading.Thread(target=run, name='event-log-flusher', daemon=True)
+        self._flusher.start()
+
+    def _start_snapshot(self):
+        if self._snapshotter is not None and self._snapshotter.is_alive():
+            return
+        self._since_snapshot = 0
+        self._snapshotter = threading.Thread(target=self._snapshot_safely, name='event-log-snapshot', daemon=True)
+        self._snapshotter.start()
+
+    def _snapshot_safely(self):
+        try:
+            self.snapshot()
+        except Exception as e:
+            print(f"Error writing snapshot: {e}")
+
+    def snapshot(self):
+        """
+        Write the store and index to disk. Only short chunks of the work
+        hold the lock, so writers keep going while the snapshot is taken.
+        """
+        with self._snapshot_lock:
+            self._write_snapshot()
+
+    def _write_snapshot(self):
+        with self._lock:
+            self._sync()
+            seq = self._seq
+            base = self._file.tell()
+            cases = list(self._cases)
+            index = list(self._index.items())
+
+        tmp_path = self.snapshot_path + '.tmp'
+        case_offsets = {}
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'seq': seq, 'offset': base, 'takenAt': utc_now()},
+                               separators=(',', ':'))[:-1])
+            # Offsets below ``base`` only: replay re-indexes the tail itself
+            f.write(',"index":')
+            json.dump({k: v[:bisect.bisect_left(v, base)] for k, v in index},
+                      f, separators=(',', ':'))
+
+            f.write(',"cases":[')
+            for start in range(0, len(cases), self.snapshot_chunk):
+                chunk = cases[start:start + self.snapshot_chunk]
+                with self._lock:
+                    self._file.flush()
+                    covered = self._file.tell()
+                    encoded = [json.dumps(c, separators=(',', ':'), default=json_default) for c in chunk]
+                if covered > base:
+                    for c in chunk:
+                        case_offsets[c['id']] = covered
+                if start:
+                    f.write(',')
+                f.write(','.join(encoded))
+            f.write('],"caseOffsets":')
+            json.dump(case_offsets, f, separators=(',', ':'))
+            f.write('}')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+    def close(self):
+        self._stop.set()
+        if self._snapshotter is not None:
+            self._snapshotter.join()
+        with self._lock:
+            if self._file:
+                self._sync()
+                self._file.close()
+                self._file = None
+
+    # Reading ----------------------------------------------------------
+
+    def get_case(self, case_id):
+        """The live case with this id, or None (the map replay and ``record`` use)"""
+        return self._cases_by_id.get(case_id)
+
+    def history(self, case_id, limit=None):
+        """Return the events recorded for a case, oldest first, via the offset index"""
+        with self._lock:
+            offsets = list(self._index.get(case_id, []))
+            self._file.flush()
+        if limit:
+            offsets = offsets[-limit:]
+        events = []
+        with open(self.log_path, 'rb') as f:
+            for offset in offsets:
+                f.seek(offset)
+                events.append(json.loads(f.readline()))
+        return events
@@ -0,0 +1,77 @@
+"""Memory benchmark: plain dict cases vs compact records
+
+Usage: python bench_memory.py [--cases 1000000]
+"""
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from compact_model import compact_cases
+from mock_data import CASES
+
+
+def generate_cases(n):
+    """
+    Yield ``n`` distinct cases built from the mock templates.
+
+    Each case goes through a JSON round trip, as cases loaded from a
+    snapshot or API payload would, so repeated strings are separate
+    objects just like in the live store. Free-text fields (address, notes,
+    check details, employer, document file names) are made unique per
+    case, as they are in a real book, so interning gets no credit for them.
+    """
+    templates = [json.dumps(case) for case in CASES]
+    for i in range(n):
+        case = json.loads(templates[i % len(templates)])
+        case['id'] = f"C-{1000000 + i}"
+        case['customer']['name'] = f"{case['customer']['name']} {i}"
+        case['customer']['address'] = f"Unit {i}, {case['customer']['address']}"
+        for doc in case['documents']:
+            doc['id'] = f"DOC-{i}-{doc['id']}"
+            doc['name'] = f"{i}_{doc['name']}"
+        for statement in case.get('bankStatements') or []:
+            statement['notes'] = f"{statement['notes']} (ref {i})"
+        for check in case.get('checks') or []:
+            check['details'] = f"{check['details']} (ref {i})"
+        if case.get('occupationForm') and case['occupationForm'].get('employer'):
+            case['occupationForm']['employer'] = f"{case['occupationForm']['employer']} {i}"
+        yield case
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    store = build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return store, current, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cases', type=int, default=1000000)
+    args = parser.parse_args()
+
+    store, plain_bytes, plain_time = measure(lambda: list(generate_cases(args.cases)))
+    sample = store[args.cases // 2]
+    del store
+
+    store, compact_bytes, compact_time = measure(lambda: compact_cases(generate_cases(args.cases)))
+    assert json.dumps(store[args.cases // 2].to_dict(), sort_keys=True) == json.dumps(sample, sort_keys=True)
+    del store
+
+    mb = 1024 * 1024
+    print(f"cases:   {args.cases}")
+    print(f"dicts:   {plain_bytes / mb:10.1f} MB  ({plain_bytes / args.cases:.0f} B/case, built in {plain_time:.1f}s)")
+    print(f"compact: {compact_bytes / mb:10.1f} MB  ({compact_bytes / args.cases:.0f} B/case, built in {compact_time:.1f}s)")
+    print(f"ratio:   {plain_bytes / compact_bytes:10.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,324 @@
+"""Compact slotted records for cases, with dict-compatible access and lazy JSON views"""
+
+import datetime
+import re
+import sys
+from collections.abc import MutableMapping
+
+_MISSING = object()
+
+# ISO-8601 UTC timestamps as written by the app and the mock data
+_TIMESTAMP = re.compile(r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d{6})?Z')
+_EPOCH = datetime.datetime(1970, 1, 1)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+# Shared objects for low-cardinality numbers (confidences, risk scores)
+_SHARED_NUMBERS = {}
+_MAX_SHARED_NUMBERS = 100000
+
+
+def _pack_time(text):
+    """
+    An ISO timestamp as one int: microseconds since the epoch, times two,
+    plus one if the text had a fraction. Anything that wouldn't turn back
+    into exactly the same text is kept as it is.
+    """
+    # Years before 1000 would not be zero-padded again by strftime
+    if text[0] == '0' or not _TIMESTAMP.fullmatch(text):
+        return text
+    try:
+        delta = datetime.datetime.fromisoformat(text[:-1]) - _EPOCH
+    except ValueError:
+        return text
+    return (delta // _MICROSECOND) * 2 + (len(text) > 20)
+
+
+def _unpack_time(packed):
+    micros, fraction = divmod(packed, 2)
+    moment = _EPOCH + datetime.timedelta(microseconds=micros)
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.%fZ' if fraction else '%Y-%m-%dT%H:%M:%SZ')
+
+
+def _share(value):
+    # Keyed by type too, so 1, 1.0 and True stay distinct
+    key = (type(value), value)
+    shared = _SHARED_NUMBERS.get(key)
+    if shared is None:
+        if len(_SHARED_NUMBERS) >= _MAX_SHARED_NUMBERS:
+            return value
+        shared = _SHARED_NUMBERS[key] = value
+    return shared
+
+
+class Record(MutableMapping):
+    """
+    Base for slotted records that behave like the dicts they replace.
+
+    Known keys live in ``__slots__`` (no per-instance ``__dict__``), values
+    of enum-like fields listed in ``INTERNED`` (or the string items of such
+    lists) are interned so each distinct status / type / category string
+    (or confidence-like number) is stored once, timestamps in ``TIMESTAMPS``
+    are packed into ints and free text in ``TEXT`` is kept UTF-8 encoded
+    (a bytes object has 16 bytes less overhead than a str), both turned
+    back into the same str on read, and any other key goes into a small
+    ``_extra`` dict created on first use. ``NESTED`` maps keys to the record class used for
+    nested dicts or lists of dicts; such lists are stored as a RecordList,
+    so dicts appended later (by event appliers) are converted too.
+
+    Route code keeps using ``case['status']``, ``case.get(...)`` etc.;
+    a plain dict is only materialized by ``to_dict`` when serializing.
+    """
+
+    __slots__ = ('_extra',)
+    FIELDS = ()
+    INTERNED = frozenset()
+    TIMESTAMPS = frozenset()
+    TEXT = frozenset()
+    NESTED = {}
+
+    def __init__(self, data=None):
+        self._extra = None
+        if data:
+            for key, value in data.items():
+                self[key] = value
+
+    @classmethod
+    def from_dict(cls, data):
+        return data if data is None or isinstance(data, cls) else cls(data)
+
+    def __getitem__(self, key):
+        if key in self.FIELDS:
+            value = getattr(self, key, _MISSING)
+            if value is _MISSING:
+                raise KeyError(key)
+            if type(value) is int and key in self.TIMESTAMPS:
+                return _unpack_time(value)
+            if type(value) is bytes and key in self.TEXT:
+                return value.decode()
+            return value
+        if self._extra and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in self.FIELDS:
+            nested = self.NESTED.get(key)
+            if nested is not None and value is not None:
+                if isinstance(value, list):
+                    value = RecordList.of(nested)([nested.from_dict(v) if isinstance(v, dict) else v for v in value])
+                elif isinstance(value, dict):
+                    value = nested.from_dict(value)
+            elif key in self.INTERNED:
+                if type(value) is str:
+                    value = sys.intern(value)
+                elif type(value) in (int, float):
+                    value = _share(value)
+                elif type(value) is list:
+                    value = list([sys.intern(v) if type(v) is str else v for v in value])
+            elif key in self.TIMESTAMPS and type(value) is str:
+                value = _pack_time(value)
+            elif key in self.TEXT and type(value) is str:
+                value = value.encode()
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def setdefault(self, key, default=None):
+        # The mixin would return ``default`` itself, but __setitem__ may store
+        # a converted copy (records for NESTED lists), so return what's stored
+        try:
+            return self[key]
+        except KeyError:
+            self[key] = default
+            return self[key]
+
+    def __delitem__(self, key):
+        if key in self.FIELDS:
+            if getattr(self, key, _MISSING) is _MISSING:
+                raise KeyError(key)
+            delattr(self, key)
+        elif self._extra and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        for key in self.FIELDS:
+            if getattr(self, key, _MISSING) is not _MISSING:
+                yield key
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def to_dict(self):
+        """Materialize a plain (deep) dict for JSON responses"""
+        result = {}
+        for key in self:
+            result[key] = _plain(self[key])
+        return result
+
+
+class RecordList(list):
+    """
+    A list of nested records that converts plain dicts as they are added
+    (append, extend, insert, item and slice assignment, +=).
+    ``RecordList.of(Document)`` is the list type for documents.
+    """
+
+    __slots__ = ()
+    record = None
+    _types = {}
+
+    @classmethod
+    def of(cls, record):
+        list_type = cls._types.get(record)
+        if list_type is None:
+            list_type = cls._types[record] = type(f'{record.__name__}List', (cls,),
+                                                  {'__slots__': (), 'record': record})
+        return list_type
+
+    def _convert(self, value):
+        return self.record.from_dict(value) if isinstance(value, dict) else value
+
+    def append(self, value):
+        super().append(self._convert(value))
+
+    def extend(self, values):
+        super().extend([self._convert(v) for v in values])
+
+    def insert(self, index, value):
+        super().insert(index, self._convert(value))
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            value = [self._convert(v) for v in value]
+        else:
+            value = self._convert(value)
+        super().__setitem__(index, value)
+
+    def __iadd__(self, values):
+        self.extend(values)
+        return self
+
+
+def _plain(value):
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [_plain(v) for v in value]
+    return value
+
+
+def json_default(value):
+    """``default=`` hook for json.dumps (event log, exports) and Flask's JSON provider"""
+    if isinstance(value, Record):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class Customer(Record):
+    FIELDS = ('name', 'dob', 'address', 'tier', 'isWealthCustomer')
+    # Birth dates repeat heavily across a large book (~36k distinct values per century)
+    INTERNED = frozenset({'dob', 'tier'})
+    TEXT = frozenset({'address'})
+    __slots__ = FIELDS
+
+
+class OcrResult(Record):
+    FIELDS = ('Name', 'Occupation', 'FIN', 'date_of_application', 'date_of_issue',
+              'date_of_expiry', 'extracted_text', 'confidence', 'processing_status')
+    INTERNED = frozenset({'Occupation', 'confidence', 'processing_status'})
+    TEXT = frozenset({'extracted_text'})
+    __slots__ = FIELDS
+
+
+class AlternativeType(Record):
+    FIELDS = ('type', 'confidence')
+    INTERNED = frozenset({'type', 'confidence'})
+    __slots__ = FIELDS
+
+
+class Classification(Record):
+    FIELDS = ('document_type', 'confidence', 'alternative_types', 'classification_status',
+              'backend', 'pages', 'mime_type')
+    INTERNED = frozenset({'document_type', 'confidence', 'classification_status', 'backend', 'mime_type'})
+    NESTED = {'alternative_types': AlternativeType}
+    __slots__ = FIELDS
+
+
+class PageHash(Record):
+    FIELDS = ('page', 'sha256', 'phash')
+    __slots__ = FIELDS
+
+
+class Fingerprints(Record):
+    FIELDS = ('sha256', 'pages')
+    NESTED = {'pages': PageHash}
+    __slots__ = FIELDS
+
+
+class Document(Record):
+    FIELDS = ('id', 'name', 'type', 'size', 'uploadedAt', 'status', 'category',
+              'file_path', 'ocr_result', 'classification', 'fingerprints')
+    # File names are free text: encoded, not interned
+    INTERNED = frozenset({'type', 'status', 'category'})
+    TIMESTAMPS = frozenset({'uploadedAt'})
+    TEXT = frozenset({'name'})
+    NESTED = {'ocr_result': OcrResult, 'classification': Classification, 'fingerprints': Fingerprints}
+    __slots__ = FIELDS
+
+
+class BankStatement(Record):
+    FIELDS = ('id', 'period', 'bank', 'accountType', 'averageBalance', 'monthlyIncome',
+              'flaggedTransactions', 'reviewStatus', 'reviewedBy', 'reviewDate', 'notes')
+    INTERNED = frozenset({'period', 'bank', 'accountType', 'reviewStatus', 'reviewedBy'})
+    TIMESTAMPS = frozenset({'reviewDate'})
+    TEXT = frozenset({'notes'})
+    __slots__ = FIELDS
+
+
+class OccupationForm(Record):
+    FIELDS = ('id', 'occupation', 'employer', 'employmentStatus', 'yearsEmployed',
+              'annualIncome', 'sourceOfWealth', 'netWorth', 'expectedAccountActivity',
+              'politicalExposure', 'reviewStatus', 'reviewedBy', 'reviewDate',
+              'verificationDocuments')
+    INTERNED = frozenset({'occupation', 'employmentStatus', 'reviewStatus', 'reviewedBy',
+                          'verificationDocuments'})
+    TIMESTAMPS = frozenset({'reviewDate'})
+    TEXT = frozenset({'employer', 'sourceOfWealth', 'expectedAccountActivity'})
+    __slots__ = FIELDS
+
+
+class Check(Record):
+    FIELDS = ('type', 'result', 'confidence', 'details')
+    INTERNED = frozenset({'type', 'result', 'confidence'})
+    TEXT = frozenset({'details'})
+    __slots__ = FIELDS
+
+
+class Case(Record):
+    FIELDS = ('id', 'customer', 'status', 'documents', 'bankStatements', 'occupationForm',
+              'checks', 'riskScore', 'createdAt', 'decisionNote')
+    INTERNED = frozenset({'status', 'riskScore'})
+    TIMESTAMPS = frozenset({'createdAt'})
+    TEXT = frozenset({'decisionNote'})
+    NESTED = {
+        'customer': Customer,
+        'documents': Document,
+        'bankStatements': BankStatement,
+        'occupationForm': OccupationForm,
+        'checks': Check,
+    }
+    __slots__ = FIELDS
+
+
+def compact_cases(cases):
+    """Convert a list of case dicts to compact records (records pass through)"""
+    return [Case.from_dict(case) for case in cases]
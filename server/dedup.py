@@ -0,0 +1,293 @@
+"""Exact and perceptual page hashes with a multi-index Hamming search for reused documents"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+
+from storage import UPLOAD_NAME
+
+HASH_BITS = 64
+
+# Pages whose thumbnail brightness barely varies (blank or near-blank) carry
+# no content: their hashes would match every other blank page, so skip them
+MIN_PAGE_STDDEV = 4.0
+
+
+def _thumbnail(image):
+    from PIL import Image
+
+    return list(image.convert('L').resize((9, 8), Image.LANCZOS).getdata())
+
+
+def _is_blank(pixels):
+    mean = sum(pixels) / len(pixels)
+    return (sum((p - mean) ** 2 for p in pixels) / len(pixels)) ** 0.5 < MIN_PAGE_STDDEV
+
+
+def _dhash(pixels):
+    """64-bit difference hash: brightness gradient over a 9x8 grayscale thumbnail"""
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def _image_pages(file_path):
+    """
+    Yield one PIL image per page, or nothing if no renderer is available.
+
+    Images are read with Pillow; PDFs are rendered with PyMuPDF (both in
+    requirements.txt). If either is missing, a warning is printed and only
+    the whole-file exact hash is computed.
+    """
+    ext = file_path.rsplit('.', 1)[-1].lower()
+    try:
+        if ext == 'pdf':
+            import fitz
+            from PIL import Image
+
+            with fitz.open(file_path) as pdf:
+                for page in pdf:
+                    pix = page.get_pixmap(matrix=fitz.Matrix(0.5, 0.5), colorspace=fitz.csGRAY)
+                    yield Image.frombytes('L', (pix.width, pix.height), pix.samples)
+        elif ext in ('png', 'jpg', 'jpeg'):
+            from PIL import Image
+
+            with Image.open(file_path) as image:
+                yield image.copy()
+    except ImportError as e:
+        print(f"Warning: page hashing disabled for {os.path.basename(file_path)}, "
+              f"install Pillow and PyMuPDF: {e}")
+        return
+
+
+def compute_fingerprints(file_path):
+    """
+    Exact and perceptual hashes for a saved upload.
+
+    Returns ``{"sha256": ..., "pages": [{"page": n, "sha256": ..., "phash": "hex"}]}``.
+    Page-level exact hashes are over the rendered pixels, so re-saved or
+    re-wrapped copies of the same scan still match exactly. Blank pages are
+    left out.
+    """
+    h = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+
+    pages = []
+    for number, image in enumerate(_image_pages(file_path), start=1):
+        pixels = _thumbnail(image)
+        if _is_blank(pixels):
+            continue
+        pages.append({
+            "page": number,
+            "sha256": hashlib.sha256(image.convert('L').tobytes()).hexdigest(),
+            "phash": f"{_dhash(pixels):016x}",
+        })
+    return {"sha256": h.hexdigest(), "pages": pages}
+
+
+class HashIndex:
+    """
+    Exact-hash map plus a multi-index hash table for Hamming-distance search.
+
+    Each 64-bit perceptual hash is split into ``max_distance + 1`` disjoint
+    bit bands, each with its own exact-match table. By the pigeonhole
+    principle any hash within ``max_distance`` bits of a query agrees with
+    it on at least one whole band, so a lookup only has to verify the
+    entries sharing a band value instead of scanning the whole index.
+    """
+
+    def __init__(self, max_distance=6):
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        width, extra = divmod(HASH_BITS, bands)
+        self._bands = []
+        shift = HASH_BITS
+        for i in range(bands):
+            bits = width + (1 if i < extra else 0)
+            shift -= bits
+            self._bands.append((shift, (1 << bits) - 1))
+        self._tables = [{} for _ in self._bands]
+        self._exact = {}
+        self._entries = {}  # phash -> [refs]
+        self._lock = threading.Lock()
+        self._indexed = {}  # ref -> (exact keys, phash values)
+
+    def __len__(self):
+        return len(self._indexed)
+
+    def __contains__(self, ref):
+        return ref in self._indexed
+
+    def _keys(self, value):
+        return [(value >> shift) & mask for shift, mask in self._bands]
+
+    def lookup(self, fingerprints):
+        """Return refs matching any page of ``fingerprints``, with match kind and distance"""
+        matches = {}
+        with self._lock:
+            exact_keys = [fingerprints["sha256"]] + [p["sha256"] for p in fingerprints["pages"]]
+            for key in exact_keys:
+                for ref in self._exact.get(key, ()):
+                    matches[ref] = {"match": "exact", "distance": 0}
+
+            for page in fingerprints["pages"]:
+                value = int(page["phash"], 16)
+                candidates = set()
+                for table, key in zip(self._tables, self._keys(value)):
+                    candidates.update(table.get(key, ()))
+                for candidate in candidates:
+                    distance = bin(candidate ^ value).count('1')
+                    if distance > self.max_distance:
+                        continue
+                    for ref in self._entries[candidate]:
+                        best = matches.get(ref)
+                        if best is None or distance < best["distance"]:
+                            matches[ref] = {"match": "perceptual", "distance": distance}
+        return matches
+
+    def add(self, ref, fingerprints):
+        """Index a document's hashes under ``ref`` (a (case_id, doc_id) pair)"""
+        with self._lock:
+            if ref in self._indexed:
+                return
+            exact_keys = [fingerprints["sha256"]] + [p["sha256"] for p in fingerprints["pages"]]
+            values = [int(p["phash"], 16) for p in fingerprints["pages"]]
+            self._indexed[ref] = (exact_keys, values)
+            for key in exact_keys:
+                self._exact.setdefault(key, []).append(ref)
+            for value in values:
+                refs = self._entries.setdefault(value, [])
+                if not refs:
+                    for table, key in zip(self._tables, self._keys(value)):
+                        table.setdefault(key, []).append(value)
+                refs.append(ref)
+
+    def remove(self, ref):
+        """Drop a document's hashes from the index"""
+        with self._lock:
+            exact_keys, values = self._indexed.pop(ref, ((), ()))
+            for key in exact_keys:
+                refs = self._exact.get(key, [])
+                if ref in refs:
+                    refs.remove(ref)
+                if not refs:
+                    self._exact.pop(key, None)
+            for value in values:
+                refs = self._entries.get(value, [])
+                if ref in refs:
+                    refs.remove(ref)
+                if refs:
+                    continue
+                self._entries.pop(value, None)
+                for table, key in zip(self._tables, self._keys(value)):
+                    band = table.get(key, [])
+                    if value in band:
+                        band.remove(value)
+                    if not band:
+                        table.pop(key, None)
+
+    def on_event(self, event, case):
+        """Event-log listener unindexing deleted documents"""
+        if event['type'] == 'DocumentDeleted':
+            self.remove((event['caseId'], event['payload']['documentId']))
+
+    def add_and_match(self, ref, fingerprints):
+        """Look up matches from other cases, then index the document"""
+        matches = {
+            other: info for other, info in self.lookup(fingerprints).items()
+            if other[0] != ref[0]
+        }
+        self.add(ref, fingerprints)
+        return matches
+
+
+def duplicate_check(doc_id, matches):
+    """Build a case check describing documents reused from other cases"""
+    ordered = sorted(matches.items(), key=lambda item: item[1]["distance"])
+    exact = any(info["match"] == "exact" for _, info in ordered)
+    details = ", ".join(
+        f"{case_id}/{other_doc} ({info['match']}, distance {info['distance']})"
+        for (case_id, other_doc), info in ordered[:10]
+    )
+    return {
+        "type": "Duplicate Document",
+        "result": "Review",
+        "confidence": 0.99 if exact else round(1 - ordered[0][1]["distance"] / HASH_BITS, 2),
+        "details": f"{doc_id} matches documents in other cases: {details}",
+        "documentId": doc_id,
+        "matches": [
+            {"caseId": case_id, "documentId": other_doc, **info}
+            for (case_id, other_doc), info in ordered
+        ]
+    }
+
+
+def iter_upload_backlog(upload_dir):
+    """Yield (case_id, doc_id, path) for every saved upload under ``upload_dir``"""
+    for root, _, files in os.walk(upload_dir):
+        for name in sorted(files):
+            match = UPLOAD_NAME.match(name)
+            if match:
+                yield match['case_id'], match['doc_id'], os.path.join(root, name)
+
+
+def index_backlog(index, upload_dir, on_match=None, live_paths=None):
+    """
+    Fingerprint and index every existing upload, calling
+    ``on_match(case_id, doc_id, fingerprints, matches)`` for reused documents.
+    If ``live_paths`` (the file paths of current documents) is given, files
+    no document refers to, i.e. orphans awaiting the sweeper, are skipped.
+    Returns (files indexed, files with matches).
+    """
+    live = None if live_paths is None else {os.path.abspath(p) for p in live_paths if p}
+    indexed = flagged = 0
+    for case_id, doc_id, path in iter_upload_backlog(upload_dir):
+        if (case_id, doc_id) in index:
+            continue
+        if live is not None and os.path.abspath(path) not in live:
+            continue
+        try:
+            fingerprints = compute_fingerprints(path)
+        except Exception as e:
+            print(f"Error fingerprinting {path}: {e}")
+            continue
+        matches = index.add_and_match((case_id, doc_id), fingerprints)
+        indexed += 1
+        if matches:
+            flagged += 1
+            if on_match:
+                on_match(case_id, doc_id, fingerprints, matches)
+    return indexed, flagged
+
+
+def main():
+    from audit_log import EventLog
+    from mock_data import CASES
+
+    parser = argparse.ArgumentParser(description="Find documents reused across cases in the uploads backlog")
+    parser.add_argument('--uploads', default='uploads')
+    parser.add_argument('--max-distance', type=int, default=6)
+    parser.add_argument('--data-dir', default=os.environ.get('KYC_DATA_DIR', 'data'))
+    args = parser.parse_args()
+
+    # Read-only: the server may be appending to the same log right now
+    cases = EventLog(args.data_dir).load_readonly(CASES)
+    live_paths = [doc.get('file_path') for case in cases for doc in case.get('documents', [])]
+
+    def report(case_id, doc_id, fingerprints, matches):
+        print(json.dumps(duplicate_check(doc_id, matches) | {"caseId": case_id}))
+
+    indexed, flagged = index_backlog(HashIndex(args.max_distance), args.uploads, report, live_paths)
+    print(f"Indexed {indexed} files, {flagged} reused across cases")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,429 @@
+"""Pluggable document-intelligence backends (classification + OCR) with routing and timing"""
+
+import fnmatch
+import hashlib
+import json
+import mimetypes
+import os
+import random
+import re
+import threading
+import time
+
+DOCUMENT_TYPES = [
+    "Employment Pass",
+    "Passport",
+    "Bank Statement",
+    "Billing Form",
+    "Employment Letter"
+]
+
+
+def file_digest(file_path):
+    """SHA-256 of a file's contents, used as the record/replay key"""
+    h = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def pdf_page_count(file_path):
+    """Cheap PDF page count by scanning for page objects (no PDF library needed)"""
+    if not file_path.lower().endswith('.pdf'):
+        return 1
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    return max(1, len(re.findall(rb'/Type\s*/Page(?![s\w])', data)))
+
+
+class DocumentBackend:
+    """
+    Base class for document-intelligence engines.
+
+    ``classify`` and ``ocr`` take the saved file path and extension (plus
+    the original upload filename when known) and return the same dict
+    shapes the Mistral implementation returns. A backend may return None
+    to decline a document, letting the router fall through to the next
+    matching rule.
+    """
+
+    name = 'base'
+
+    def classify(self, file_path, file_type, filename=None):
+        return None
+
+    def ocr(self, file_path, file_type, filename=None):
+        return None
+
+
+class MistralBackend(DocumentBackend):
+    """Mistral VLM classification and Mistral OCR document annotation"""
+
+    name = 'mistral'
+
+    def __init__(self, api_key=None):
+        self.api_key = api_key or os.environ.get('MISTRAL_API_KEY')
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from mistralai import Mistral
+            if not self.api_key:
+                raise RuntimeError("MISTRAL_API_KEY is not set")
+            self._client = Mistral(api_key=self.api_key)
+        return self._client
+
+    def _signed_url(self, file_path):
+        with open(file_path, 'rb') as content:
+            uploaded_pdf = self.client.files.upload(
+                file={
+                    "file_name": file_path,
+                    "content": content,
+                },
+                purpose="ocr"
+            )
+        return self.client.files.get_signed_url(file_id=uploaded_pdf.id)
+
+    def classify(self, file_path, file_type, filename=None):
+        signed_url = self._signed_url(file_path)
+
+        # Define the messages for the chat
+        messages = [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": f"What is the type of this document? Response in a JSON format with key as document_type and a value between {DOCUMENT_TYPES}"
+                    },
+                    {
+                        "type": "image_url",
+                        "image_url": signed_url.url
+                    }
+                ]
+            }
+        ]
+
+        # Get the chat response
+        chat_response = self.client.chat.complete(
+            model="mistral-small-latest",
+            messages=messages,
+            response_format={
+                "type": "json_object"
+            }
+        )
+
+        document_type = json.loads(chat_response.choices[0].message.content)['document_type']
+
+        # Simulate classification with confidence scores
+        return {
+            "document_type": document_type,
+            "confidence": round(random.uniform(0.85, 0.99), 2),
+            "alternative_types": [
+                {
+                    "type": document_type,
+                    "confidence": round(random.uniform(0.10, 0.30), 2)
+                }
+            ],
+            "classification_status": "completed"
+        }
+
+    def ocr(self, file_path, file_type, filename=None):
+        from pydantic import BaseModel, Field
+        from mistralai.extra import response_format_from_pydantic_model
+
+        signed_url = self._signed_url(file_path)
+
+        # Document Annotation response format
+        class Document(BaseModel):
+            Name: str
+            Occupation: str
+            FIN: str
+            date_of_application: str
+            date_of_issue: str
+            date_of_expiry: str
+
+        class Image(BaseModel):
+            image_type: str = Field(..., description="The type of the image.")
+            smiling: str = Field(..., description="Whether the person on the image smiling or not")
+            fraud: str = Field(..., description="Whether the document looks like it has been forged.")
+
+        # Client call
+        response = self.client.ocr.process(
+            model="mistral-ocr-latest",
+            pages=list(range(8)),
+            document={
+                "type": "document_url",
+                "document_url": signed_url.url,
+            },
+            bbox_annotation_format=response_format_from_pydantic_model(Image),
+            document_annotation_format=response_format_from_pydantic_model(Document),
+            include_image_base64=True
+        )
+
+        ocr_result = json.loads(response.document_annotation)
+        ocr_result['extracted_text'] = "\n\n".join(
+            getattr(page, 'markdown', '') or '' for page in getattr(response, 'pages', []) or []
+        ) or "Mock OCR text extracted from document"
+        ocr_result['confidence'] = 0.95
+        ocr_result['processing_status'] = "completed"
+        return ocr_result
+
+
+class HeuristicBackend(DocumentBackend):
+    """
+    Fast local classifier from filename keywords, MIME type and page count.
+
+    Only answers when a filename keyword matches with at least
+    ``min_confidence``; anything ambiguous is declined so the router can
+    hand it to a real engine. Does no OCR.
+    """
+
+    name = 'heuristic'
+
+    KEYWORDS = [
+        ("Passport", ("passport",)),
+        ("Employment Pass", ("employment_pass", "employment-pass", "work_pass", "ep_card")),
+        ("Bank Statement", ("bank_statement", "bank-statement", "statement", "bank")),
+        ("Employment Letter", ("employment_letter", "employment-letter", "offer_letter", "employment")),
+        ("Billing Form", ("utility", "bill", "invoice", "billing")),
+    ]
+
+    def __init__(self, min_confidence=0.85):
+        self.min_confidence = min_confidence
+
+    def classify(self, file_path, file_type, filename=None):
+        filename = (filename or os.path.basename(file_path)).lower()
+        mime_type, _ = mimetypes.guess_type(filename)
+        pages = pdf_page_count(file_path)
+
+        for document_type, keywords in self.KEYWORDS:
+            if any(keyword in filename for keyword in keywords):
+                break
+        else:
+            return None
+
+        # Identity documents are single-page images or short PDFs; statements run long
+        confidence = 0.8
+        if document_type in ("Passport", "Employment Pass"):
+            confidence += 0.1 if pages <= 2 else -0.2
+        elif document_type == "Bank Statement" and mime_type == 'application/pdf' and pages >= 2:
+            confidence += 0.1
+        if confidence < self.min_confidence:
+            return None
+
+        return {
+            "document_type": document_type,
+            "confidence": round(confidence, 2),
+            "alternative_types": [],
+            "classification_status": "completed",
+            "pages": pages,
+            "mime_type": mime_type
+        }
+
+
+class RecordReplayBackend(DocumentBackend):
+    """
+    Record responses from a wrapped backend and replay them offline.
+
+    Responses are keyed by operation and file content hash and appended to
+    a JSON-lines cassette along with how long the real call took. In replay
+    mode the recorded result is returned after sleeping the recorded
+    latency times ``latency_scale`` (0 replays at full speed).
+    Unknown files fall through to the wrapped backend if there is one.
+    """
+
+    def __init__(self, cassette_path, inner=None, mode='replay', latency_scale=1.0):
+        self.cassette_path = cassette_path
+        self.inner = inner
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.name = f"{mode}:{inner.name}" if inner else mode
+        self._entries = {}
+        self._lock = threading.Lock()
+        if os.path.exists(cassette_path):
+            with open(cassette_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[(entry['op'], entry['key'])] = entry
+
+    def _call(self, op, file_path, file_type, filename=None):
+        key = file_digest(file_path)
+        entry = self._entries.get((op, key))
+        if entry is not None and self.mode == 'replay':
+            if self.latency_scale:
+                time.sleep(entry['latency'] * self.latency_scale)
+            return json.loads(json.dumps(entry['result']))
+        if self.inner is None:
+            return None
+
+        start = time.perf_counter()
+        result = getattr(self.inner, op)(file_path, file_type, filename)
+        latency = time.perf_counter() - start
+        if result is not None and self.mode == 'record':
+            entry = {'op': op, 'key': key, 'latency': round(latency, 4),
+                     'file': filename or os.path.basename(file_path),
+                     'result': json.loads(json.dumps(result))}
+            with self._lock:
+                self._entries[(op, key)] = entry
+                os.makedirs(os.path.dirname(self.cassette_path) or '.', exist_ok=True)
+                with open(self.cassette_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry) + '\n')
+        return result
+
+    def classify(self, file_path, file_type, filename=None):
+        return self._call('classify', file_path, file_type, filename)
+
+    def ocr(self, file_path, file_type, filename=None):
+        return self._call('ocr', file_path, file_type, filename)
+
+
+class BackendStats:
+    """Call counts and latency per (backend, operation)"""
+
+    def __init__(self, keep=1000):
+        self.keep = keep
+        self._samples = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def add(self, backend, op, seconds, outcome):
+        key = (backend, op)
+        with self._lock:
+            samples = self._samples.setdefault(key, [])
+            samples.append(seconds)
+            if len(samples) > self.keep:
+                del samples[:len(samples) - self.keep]
+            counts = self._counts.setdefault(key, {})
+            counts[outcome] = counts.get(outcome, 0) + 1
+
+    def to_dict(self):
+        with self._lock:
+            result = []
+            for (backend, op), samples in self._samples.items():
+                ordered = sorted(samples)
+                result.append({
+                    "backend": backend,
+                    "operation": op,
+                    "calls": self._counts[(backend, op)],
+                    "meanMs": round(1000 * sum(ordered) / len(ordered), 2),
+                    "p50Ms": round(1000 * ordered[len(ordered) // 2], 2),
+                    "p95Ms": round(1000 * ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+                    "maxMs": round(1000 * ordered[-1], 2),
+                })
+            return result
+
+
+class BackendRouter:
+    """
+    Route each operation through an ordered list of rules.
+
+    A rule is ``(predicate, backend)`` where ``predicate(file_path, file_type, filename)``
+    decides whether the backend should be tried; the first backend that
+    returns a result wins. Every attempt is timed into ``stats``.
+    """
+
+    def __init__(self, classify_rules, ocr_rules):
+        self.rules = {'classify': classify_rules, 'ocr': ocr_rules}
+        self.stats = BackendStats()
+
+    def _route(self, op, file_path, file_type, filename=None):
+        last_error = None
+        for predicate, backend in self.rules[op]:
+            if predicate and not predicate(file_path, file_type, filename):
+                continue
+            start = time.perf_counter()
+            try:
+                result = getattr(backend, op)(file_path, file_type, filename)
+            except Exception as e:
+                self.stats.add(backend.name, op, time.perf_counter() - start, 'error')
+                last_error = e
+                continue
+            self.stats.add(backend.name, op, time.perf_counter() - start,
+                           'declined' if result is None else 'ok')
+            if result is not None:
+                result['backend'] = backend.name
+                return result
+        if last_error:
+            raise last_error
+        raise RuntimeError(f"no document backend handled {op} for {os.path.basename(file_path)}")
+
+    def classify(self, file_path, file_type, filename=None):
+        return self._route('classify', file_path, file_type, filename)
+
+    def ocr(self, file_path, file_type, filename=None):
+        return self._route('ocr', file_path, file_type, filename)
+
+
+def file_predicate(extensions=None, mime_types=None):
+    """
+    A routing predicate matching files by extension and / or MIME type.
+    MIME patterns may use wildcards (``image/*``); an empty filter matches
+    everything, so ``file_predicate()`` returns None (always route).
+    """
+    extensions = {e.lower().lstrip('.') for e in extensions or [] if e}
+    mime_types = [m.lower() for m in mime_types or [] if m]
+    if not extensions and not mime_types:
+        return None
+
+    def predicate(file_path, file_type, filename=None):
+        name = filename or file_path
+        if extensions and os.path.splitext(name)[1].lower().lstrip('.') not in extensions:
+            return False
+        if mime_types:
+            mime = (file_type if '/' in (file_type or '') else mimetypes.guess_type(name)[0]) or ''
+            if not any(fnmatch.fnmatch(mime.lower(), pattern) for pattern in mime_types):
+                return False
+        return True
+
+    return predicate
+
+
+def _env_list(env, key):
+    return [item.strip() for item in env.get(key, '').split(',') if item.strip()]
+
+
+def build_router_from_env(environ=None):
+    """
+    Build the router from environment settings.
+
+    KYC_DOC_BACKEND        mistral (default) | record | replay
+    KYC_DOC_CASSETTE       cassette path for record/replay ($KYC_DATA_DIR/doc_intel_cassette.jsonl)
+    KYC_REPLAY_LATENCY     replay latency scale, 0 for full speed (default 1)
+    KYC_HEURISTIC_CLASSIFY 1 to try the local heuristic classifier first
+    KYC_HEURISTIC_MIN_CONFIDENCE  minimum heuristic confidence to accept (default 0.85)
+    KYC_HEURISTIC_EXTENSIONS / KYC_HEURISTIC_MIME_TYPES
+                           comma-separated extensions / MIME patterns the heuristic
+                           classifier is tried for (default: all files)
+    KYC_DOC_EXTENSIONS / KYC_DOC_MIME_TYPES
+                           comma-separated extensions / MIME patterns the main engine
+                           accepts; other files are rejected (default: all files)
+    """
+    env = os.environ if environ is None else environ
+    mode = env.get('KYC_DOC_BACKEND', 'mistral')
+    cassette = env.get('KYC_DOC_CASSETTE',
+                       os.path.join(env.get('KYC_DATA_DIR', 'data'), 'doc_intel_cassette.jsonl'))
+
+    if mode == 'mistral':
+        primary = MistralBackend()
+    elif mode == 'record':
+        primary = RecordReplayBackend(cassette, inner=MistralBackend(), mode='record')
+    elif mode == 'replay':
+        primary = RecordReplayBackend(cassette, mode='replay',
+                                      latency_scale=float(env.get('KYC_REPLAY_LATENCY', '1')))
+    else:
+        raise ValueError(f"unknown KYC_DOC_BACKEND: {mode}")
+
+    primary_rule = (file_predicate(_env_list(env, 'KYC_DOC_EXTENSIONS'),
+                                   _env_list(env, 'KYC_DOC_MIME_TYPES')), primary)
+    classify_rules = [primary_rule]
+    if env.get('KYC_HEURISTIC_CLASSIFY', '0').lower() in ('1', 'true'):
+        heuristic = HeuristicBackend(float(env.get('KYC_HEURISTIC_MIN_CONFIDENCE', '0.85')))
+        predicate = file_predicate(_env_list(env, 'KYC_HEURISTIC_EXTENSIONS'),
+                                   _env_list(env, 'KYC_HEURISTIC_MIME_TYPES'))
+        classify_rules.insert(0, (predicate, heuristic))
+
+    return BackendRouter(classify_rules, [primary_rule])
@@ -0,0 +1,220 @@
+"""Entity resolution: link cases that refer to the same customer"""
+
+import re
+import threading
+import unicodedata
+from difflib import SequenceMatcher
+
+TITLES = {'mr', 'mrs', 'ms', 'miss', 'dr', 'prof', 'sir', 'jr', 'sr'}
+
+# Blocks bigger than this are too common to be informative (e.g. one popular
+# surname + birth date); skipping them keeps matching near-linear
+MAX_BLOCK_SIZE = 200
+
+MATCH_THRESHOLD = 0.8
+
+
+def normalize_name(name):
+    """Lowercase, accent-free name tokens without titles"""
+    text = unicodedata.normalize('NFKD', name or '').encode('ascii', 'ignore').decode().lower()
+    return [t for t in re.findall(r'[a-z]+', text) if t not in TITLES]
+
+
+def normalize_fin(value):
+    return re.sub(r'[^A-Z0-9]', '', str(value or '').upper())
+
+
+def case_profile(case):
+    """Matching attributes for a case: name tokens, dob, address tokens and FINs from OCR"""
+    customer = case.get('customer') or {}
+    fins = set()
+    for doc in case.get('documents', []):
+        fin = normalize_fin((doc.get('ocr_result') or {}).get('FIN'))
+        if len(fin) >= 5:
+            fins.add(fin)
+    return {
+        'name': normalize_name(customer.get('name')),
+        'dob': (customer.get('dob') or '').strip(),
+        'address': set(re.findall(r'[a-z0-9]+', (customer.get('address') or '').lower())),
+        'fins': fins,
+    }
+
+
+def blocking_keys(profile):
+    """Keys whose shared value makes two cases worth comparing"""
+    keys = set()
+    name = profile['name']
+    if name:
+        keys.add('n:' + ' '.join(sorted(name)))
+        if profile['dob']:
+            for token in name:
+                keys.add(f"td:{token}|{profile['dob']}")
+    for fin in profile['fins']:
+        keys.add('f:' + fin)
+    return keys
+
+
+def score_pair(a, b, threshold=0.0):
+    """
+    Match score in [0, 1] and the evidence behind it.
+
+    A shared FIN is near-conclusive; otherwise the score combines name
+    similarity (order-insensitive), date of birth and address overlap.
+    Pairs that cannot reach ``threshold`` even with identical names are
+    cut off before the (comparatively expensive) name comparison.
+    """
+    reasons = []
+    if a['fins'] & b['fins']:
+        reasons.append('fin')
+        return 0.99, reasons
+
+    dob_match = bool(a['dob']) and a['dob'] == b['dob']
+    if 0.65 + (0.35 if dob_match else 0.0) < threshold:
+        return 0.0, reasons
+
+    name_a, name_b = ' '.join(sorted(a['name'])), ' '.join(sorted(b['name']))
+    name_sim = SequenceMatcher(None, name_a, name_b).ratio() if name_a and name_b else 0.0
+    if name_sim >= 0.85:
+        reasons.append('name')
+    if dob_match:
+        reasons.append('dob')
+    union = a['address'] | b['address']
+    address_sim = len(a['address'] & b['address']) / len(union) if union else 0.0
+    if address_sim >= 0.6:
+        reasons.append('address')
+
+    score = 0.55 * name_sim + (0.35 if dob_match else 0.0) + 0.10 * address_sim
+    return round(score, 3), reasons
+
+
+class EntityResolver:
+    """
+    Incremental entity resolution over the case book.
+
+    Each case is indexed under its blocking keys; a new or updated case is
+    scored only against cases sharing a block, and matches above
+    ``threshold`` are merged in a union-find forest (path halving + union
+    by size). The work per update is bounded by block sizes, so the whole
+    book resolves in near-linear time. When a re-indexed case no longer
+    matches a linked case (e.g. the document carrying a shared FIN was
+    deleted), the link is dropped and that one cluster is rebuilt from its
+    remaining links.
+    """
+
+    def __init__(self, threshold=MATCH_THRESHOLD, max_block_size=MAX_BLOCK_SIZE):
+        self.threshold = threshold
+        self.max_block_size = max_block_size
+        self._parent = {}
+        self._size = {}
+        self._members = {}    # root -> set of case ids
+        self._blocks = {}     # key -> set of case ids
+        self._keys = {}       # case id -> keys
+        self._profiles = {}   # case id -> profile
+        self._edges = {}      # case id -> {other id: (score, reasons)}
+        self._lock = threading.RLock()
+
+    # Union-find -------------------------------------------------------
+
+    def _find(self, x):
+        parent = self._parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def _union(self, a, b):
+        ra, rb = self._find(a), self._find(b)
+        if ra == rb:
+            return
+        if self._size[ra] < self._size[rb]:
+            ra, rb = rb, ra
+        self._parent[rb] = ra
+        self._size[ra] += self._size[rb]
+        self._members[ra] |= self._members.pop(rb)
+
+    def _recluster(self, root):
+        """Rebuild one cluster from the links between its members"""
+        members = self._members.pop(root)
+        for member in members:
+            self._parent[member] = member
+            self._size[member] = 1
+            self._members[member] = {member}
+        for member in members:
+            for other in self._edges.get(member, ()):
+                self._union(member, other)
+
+    # Updates ----------------------------------------------------------
+
+    def add_case(self, case):
+        """Index (or re-index) a case and link it to matching cases"""
+        case_id = case['id']
+        profile = case_profile(case)
+        keys = blocking_keys(profile)
+        with self._lock:
+            if case_id not in self._parent:
+                self._parent[case_id] = case_id
+                self._size[case_id] = 1
+                self._members[case_id] = {case_id}
+            for key in self._keys.get(case_id, set()) - keys:
+                self._blocks.get(key, set()).discard(case_id)
+            self._keys[case_id] = keys
+            self._profiles[case_id] = profile
+
+            # Re-check existing links against the new profile
+            dropped = False
+            for other in list(self._edges.get(case_id, {})):
+                score, reasons = score_pair(profile, self._profiles[other], self.threshold)
+                if score >= self.threshold:
+                    self._edges[case_id][other] = self._edges[other][case_id] = (score, reasons)
+                else:
+                    del self._edges[case_id][other]
+                    del self._edges[other][case_id]
+                    dropped = True
+            if dropped:
+                self._recluster(self._find(case_id))
+
+            candidates = set()
+            for key in keys:
+                block = self._blocks.setdefault(key, set())
+                if len(block) < self.max_block_size:
+                    candidates |= block
+                block.add(case_id)
+            candidates.discard(case_id)
+
+            for other in candidates:
+                score, reasons = score_pair(profile, self._profiles[other], self.threshold)
+                if score >= self.threshold:
+                    self._edges.setdefault(case_id, {})[other] = (score, reasons)
+                    self._edges.setdefault(other, {})[case_id] = (score, reasons)
+                    self._union(case_id, other)
+
+    def on_event(self, event, case):
+        """Event-log listener: documents added or deleted change the FINs that link cases"""
+        if case is not None and event['type'] in ('DocumentAdded', 'DocumentsIngested', 'DocumentDeleted'):
+            self.add_case(case)
+
+    # Queries ----------------------------------------------------------
+
+    def cluster(self, case_id):
+        """Cluster id and the other case ids in the same cluster"""
+        with self._lock:
+            if case_id not in self._parent:
+                return None, []
+            root = self._find(case_id)
+            return root, sorted(self._members[root] - {case_id})
+
+    def evidence(self, case_id, other):
+        """Direct match score and reasons between two cases, if they were compared"""
+        with self._lock:
+            return self._edges.get(case_id, {}).get(other)
+
+    def stats(self):
+        with self._lock:
+            sizes = [len(m) for m in self._members.values()]
+            return {
+                "cases": len(self._parent),
+                "clusters": len(sizes),
+                "linkedClusters": sum(1 for s in sizes if s > 1),
+                "largestCluster": max(sizes, default=0),
+                "blocks": len(self._blocks),
+            }
@@ -0,0 +1,203 @@
+"""Streaming and offline bulk export of cases and their nested records"""
+
+import argparse
+import csv
+import json
+import os
+
+from compact_model import json_default
+
+# Export kinds: name -> (case key holding the records, or None for the case itself)
+EXPORT_KINDS = {
+    'cases': None,
+    'documents': 'documents',
+    'bank-statements': 'bankStatements',
+    'checks': 'checks',
+}
+
+# Flat column layouts used for the columnar (CSV / Parquet) export
+COLUMNS = {
+    'cases': ['id', 'customerName', 'dob', 'address', 'tier', 'isWealthCustomer',
+              'status', 'riskScore', 'createdAt', 'documentCount', 'decisionNote'],
+    'documents': ['caseId', 'id', 'name', 'type', 'size', 'uploadedAt', 'status', 'category'],
+    'bank-statements': ['caseId', 'id', 'period', 'bank', 'accountType', 'averageBalance',
+                        'monthlyIncome', 'flaggedTransactions', 'reviewStatus',
+                        'reviewedBy', 'reviewDate', 'notes'],
+    'checks': ['caseId', 'type', 'result', 'confidence', 'details'],
+}
+
+
+# Non-string column types for the Parquet schema (everything else is a string)
+NUMERIC_COLUMNS = {
+    'riskScore': 'float64', 'confidence': 'float64',
+    'averageBalance': 'float64', 'monthlyIncome': 'float64',
+    'size': 'int64', 'documentCount': 'int64', 'flaggedTransactions': 'int64',
+    'isWealthCustomer': 'bool',
+}
+
+
+def case_matches(case, status=None, created_from=None, created_to=None):
+    """
+    Filter on status and an inclusive createdAt range (ISO strings compare
+    lexically). A shorter bound such as a bare date matches every timestamp
+    it prefixes, so ``created_to='2025-02-01'`` includes that whole day.
+    """
+    if status and case.get('status') not in status:
+        return False
+    created_at = case.get('createdAt') or ''
+    if created_from and created_at < created_from:
+        return False
+    if created_to and created_at[:len(created_to)] > created_to:
+        return False
+    return True
+
+
+def iter_cases(cases, **filters):
+    """
+    Yield matching cases one at a time.
+
+    Walks the list by index rather than copying it, so memory stays flat
+    and cases appended while the export runs are still picked up.
+    """
+    i = 0
+    while i < len(cases):
+        case = cases[i]
+        i += 1
+        if case_matches(case, **filters):
+            yield case
+
+
+def iter_records(cases, kind, **filters):
+    """Yield records of the given kind; nested records carry their caseId"""
+    key = EXPORT_KINDS[kind]
+    for case in iter_cases(cases, **filters):
+        if key is None:
+            yield case
+            continue
+        for record in case.get(key) or []:
+            row = {'caseId': case['id']}
+            row.update(record)
+            yield row
+
+
+def iter_ndjson(cases, kind, **filters):
+    """Yield one JSON line per record, for use as a streamed response body"""
+    for record in iter_records(cases, kind, **filters):
+        yield json.dumps(record, default=json_default) + '\n'
+
+
+def flat_row(kind, record):
+    """Project a record onto the flat column layout for its kind"""
+    if kind == 'cases':
+        customer = record.get('customer') or {}
+        return {
+            'id': record.get('id'),
+            'customerName': customer.get('name'),
+            'dob': customer.get('dob'),
+            'address': customer.get('address'),
+            'tier': customer.get('tier'),
+            'isWealthCustomer': customer.get('isWealthCustomer'),
+            'status': record.get('status'),
+            'riskScore': record.get('riskScore'),
+            'createdAt': record.get('createdAt'),
+            'documentCount': len(record.get('documents') or []),
+            'decisionNote': record.get('decisionNote'),
+        }
+    return {col: record.get(col) for col in COLUMNS[kind]}
+
+
+def write_csv(cases, kind, path, **filters):
+    """Write one kind to CSV, row by row"""
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS[kind])
+        writer.writeheader()
+        for record in iter_records(cases, kind, **filters):
+            writer.writerow(flat_row(kind, record))
+            count += 1
+    return count
+
+
+def parquet_available():
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def write_parquet(cases, kind, path, batch_size=10000, **filters):
+    """Write one kind to Parquet in fixed-size row groups (requires pyarrow)"""
+    if not parquet_available():
+        raise RuntimeError("Parquet export requires pyarrow: pip install pyarrow")
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    columns = COLUMNS[kind]
+    schema = pa.schema([(col, NUMERIC_COLUMNS.get(col, 'string')) for col in columns])
+    writer = pq.ParquetWriter(path, schema)
+    count = 0
+    batch = {col: [] for col in columns}
+
+    def flush():
+        writer.write_table(pa.table(batch, schema=schema))
+        for col in columns:
+            batch[col] = []
+
+    try:
+        for record in iter_records(cases, kind, **filters):
+            row = flat_row(kind, record)
+            for col in columns:
+                value = row[col]
+                if value is not None and col not in NUMERIC_COLUMNS:
+                    value = str(value)
+                batch[col].append(value)
+            count += 1
+            if count % batch_size == 0:
+                flush()
+        if count % batch_size:
+            flush()
+    finally:
+        writer.close()
+    return count
+
+
+def export_all(cases, out_dir, fmt='csv', kinds=None, **filters):
+    """Export each kind to ``out_dir/<kind>.<fmt>``; returns row counts"""
+    os.makedirs(out_dir, exist_ok=True)
+    writer = write_parquet if fmt == 'parquet' else write_csv
+    counts = {}
+    for kind in kinds or EXPORT_KINDS:
+        counts[kind] = writer(cases, kind, os.path.join(out_dir, f"{kind}.{fmt}"), **filters)
+    return counts
+
+
+def main():
+    from audit_log import EventLog
+    from mock_data import CASES
+
+    parser = argparse.ArgumentParser(description="Export KYC cases to columnar files")
+    parser.add_argument('--out', default='export', help="output directory")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--kind', action='append', choices=list(EXPORT_KINDS),
+                        help="kind to export (repeatable, default: all)")
+    parser.add_argument('--status', action='append', help="only cases with this status (repeatable)")
+    parser.add_argument('--from', dest='created_from', help="createdAt lower bound (ISO)")
+    parser.add_argument('--to', dest='created_to', help="createdAt upper bound (ISO)")
+    parser.add_argument('--data-dir', default=os.environ.get('KYC_DATA_DIR', 'data'))
+    args = parser.parse_args()
+    if args.format == 'parquet' and not parquet_available():
+        parser.error("--format parquet requires pyarrow: pip install pyarrow")
+
+    # Read-only: the server may be appending to the same log right now
+    cases = EventLog(args.data_dir).load_readonly(CASES)
+
+    counts = export_all(cases, args.out, fmt=args.format, kinds=args.kind,
+                        status=args.status, created_from=args.created_from,
+                        created_to=args.created_to)
+    for kind, count in counts.items():
+        print(f"{kind}: {count} rows")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""Parallel multi-document ingestion with per-file progress tracking"""
+
+import threading
+import uuid
+import zipfile
+
+from audit_log import utc_now
+
+
+def expand_zip(fileobj, allowed, max_files=50, max_file_size=10 * 1024 * 1024,
+               max_total_size=100 * 1024 * 1024):
+    """
+    Validate a ZIP archive and return an iterator of (filename, stream) for
+    each allowed entry.
+
+    Directories, hidden files (e.g. __MACOSX) and disallowed extensions are
+    skipped. Entry count, per-file and total uncompressed sizes are checked
+    from the central directory before anything is decompressed, and raise
+    ValueError. Each stream is decompressed lazily and is only valid until
+    the iterator advances, so entries can be copied to disk one at a time.
+    """
+    archive = zipfile.ZipFile(fileobj)
+    try:
+        entries = [
+            info for info in archive.infolist()
+            if not info.is_dir()
+            and not any(part.startswith(('.', '__')) for part in info.filename.split('/'))
+            and allowed(info.filename)
+        ]
+        if len(entries) > max_files:
+            raise ValueError(f"archive has more than {max_files} files")
+        for info in entries:
+            if info.file_size > max_file_size:
+                raise ValueError(f"{info.filename} exceeds the per-file size limit")
+        if sum(info.file_size for info in entries) > max_total_size:
+            raise ValueError(f"archive expands to more than {max_total_size // (1024 * 1024)}MB")
+    except BaseException:
+        archive.close()
+        raise
+    return _iter_entries(archive, entries)
+
+
+def _iter_entries(archive, entries):
+    with archive:
+        for info in entries:
+            with archive.open(info) as stream:
+                yield info.filename.rsplit('/', 1)[-1], stream
+
+
+class IngestBatch:
+    """Progress and outcome of one bulk upload"""
+
+    def __init__(self, case_id, names):
+        self.id = f"ING-{uuid.uuid4().hex[:12]}"
+        self.case_id = case_id
+        self.created_at = utc_now()
+        self.finished_at = None
+        self.case_status = None
+        self.files = [
+            {"name": name, "status": "queued", "documentId": None, "error": None,
+             "startedAt": None, "finishedAt": None}
+            for name in names
+        ]
+        self.documents = [None] * len(names)
+        self.done = threading.Event()
+        self._remaining = len(names)
+        self._lock = threading.Lock()
+
+    @property
+    def status(self):
+        if not self.done.is_set():
+            return "processing"
+        failed = sum(1 for f in self.files if f["status"] == "failed")
+        if failed == len(self.files):
+            return "failed"
+        return "completed_with_errors" if failed else "completed"
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "caseId": self.case_id,
+            "status": self.status,
+            "createdAt": self.created_at,
+            "finishedAt": self.finished_at,
+            "caseStatus": self.case_status,
+            "total": len(self.files),
+            "completed": sum(1 for f in self.files if f["status"] == "completed"),
+            "failed": sum(1 for f in self.files if f["status"] == "failed"),
+            "files": self.files,
+        }
+
+
+class IngestionPool:
+    """
+    Fan bulk uploads out across the document-processing scheduler.
+
+    The scheduler's worker count caps how many documents are classified /
+    OCR'd at once across all batches, so total time for a batch is roughly
+    the slowest document rather than the sum. When the last file of a
+    batch finishes, ``finalize`` is called once with the successfully
+    built documents. Beyond ``keep_batches``, the oldest finished batches
+    are forgotten; batches still running are always kept.
+    """
+
+    def __init__(self, scheduler, keep_batches=200):
+        self.scheduler = scheduler
+        self.keep_batches = keep_batches
+        self._batches = {}
+        self._lock = threading.Lock()
+
+    def submit(self, case_id, items, process, finalize, priority='standard'):
+        """
+        Start processing ``items`` (one per file) for a case under a
+        scheduler priority class.
+
+        ``process(item)`` returns the new document dict or raises;
+        ``finalize(batch, documents)`` returns the resulting case status.
+        """
+        batch = IngestBatch(case_id, [item["name"] for item in items])
+        with self._lock:
+            self._batches[batch.id] = batch
+            self._evict()
+
+        if not items:
+            self._finish(batch, finalize)
+        for index, item in enumerate(items):
+            self.scheduler.submit(priority, self._run, batch, index, item, process, finalize)
+        return batch
+
+    def _run(self, batch, index, item, process, finalize):
+        entry = batch.files[index]
+        entry["status"] = "processing"
+        entry["startedAt"] = utc_now()
+        try:
+            document = process(item)
+            batch.documents[index] = document
+            entry["documentId"] = document["id"]
+            entry["status"] = "completed"
+        except Exception as e:
+            print(f"Error ingesting {entry['name']}: {e}")
+            entry["status"] = "failed"
+            entry["error"] = str(e)
+        entry["finishedAt"] = utc_now()
+
+        with batch._lock:
+            batch._remaining -= 1
+            last = batch._remaining == 0
+        if last:
+            self._finish(batch, finalize)
+
+    def _finish(self, batch, finalize):
+        try:
+            batch.case_status = finalize(batch, [d for d in batch.documents if d is not None])
+        finally:
+            batch.finished_at = utc_now()
+            batch.done.set()
+            with self._lock:
+                self._evict()
+
+    def _evict(self):
+        """Drop the oldest finished batches beyond ``keep_batches``; running ones stay pollable"""
+        excess = len(self._batches) - self.keep_batches
+        if excess > 0:
+            finished = [batch_id for batch_id, b in self._batches.items() if b.done.is_set()]
+            for batch_id in finished[:excess]:
+                del self._batches[batch_id]
+
+    def get(self, batch_id):
+        with self._lock:
+            return self._batches.get(batch_id)
@@ -386,27 +386,91 @@ POLICIES = [
     {
         "id": "POL-001",
         "title": "Customer Due Diligence Requirements",
-        "clause": "All customers must undergo identity verification including government-issued ID validation and address confirmation within 30 days of account opening."
+        "clause": "All customers must undergo identity verification including government-issued ID validation and address confirmation within 30 days of account opening.",
+        "rules": [
+            {
+                "id": "POL-001.1",
+                "description": "Identity and address verified within 30 days of opening",
+                "when": "ageDays > 30",
+                "require": "check(\"Identity Verification\") == \"Pass\" and check(\"Address Verification\") == \"Pass\""
+            }
+        ]
     },
     {
         "id": "POL-002",
         "title": "Enhanced Due Diligence for High-Risk Customers",
-        "clause": "Customers classified as high-risk (risk score > 0.7) require enhanced due diligence including source of funds verification and senior management approval."
+        "clause": "Customers classified as high-risk (risk score > 0.7) require enhanced due diligence including source of funds verification and senior management approval.",
+        "rules": [
+            {
+                "id": "POL-002.1",
+                "description": "High-risk customers need enhanced due diligence and source of funds verification",
+                "when": "riskScore > 0.7",
+                "require": "check(\"Enhanced Due Diligence\") in [\"Pass\", \"Clear\"] and check(\"Source of Funds\") in [\"Pass\", \"Clear\"]"
+            },
+            {
+                "id": "POL-002.2",
+                "description": "High-risk customers need senior management approval before approval",
+                "when": "riskScore > 0.7 and status == \"Approved\"",
+                "require": "check(\"Senior Management Approval\") == \"Pass\""
+            }
+        ]
     },
     {
         "id": "POL-003",
         "title": "PEP Screening Protocol",
-        "clause": "All customers must be screened against Politically Exposed Persons (PEP) databases. Positive matches require additional review and ongoing monitoring."
+        "clause": "All customers must be screened against Politically Exposed Persons (PEP) databases. Positive matches require additional review and ongoing monitoring.",
+        "rules": [
+            {
+                "id": "POL-003.1",
+                "description": "PEP screening performed once a case is past intake",
+                "when": "status not in [\"Ingestion\", \"Intake\"]",
+                "require": "check(\"PEP Screening\") != \"\""
+            },
+            {
+                "id": "POL-003.2",
+                "description": "PEP matches go to ongoing monitoring rather than straight approval",
+                "when": "check(\"PEP Screening\") == \"Match\"",
+                "require": "status != \"Approved\""
+            }
+        ]
     },
     {
         "id": "POL-004",
         "title": "Transaction Monitoring Thresholds",
-        "clause": "Transactions exceeding $10,000 or cumulative transactions exceeding $50,000 within 30 days trigger automatic review and potential SAR filing."
+        "clause": "Transactions exceeding $10,000 or cumulative transactions exceeding $50,000 within 30 days trigger automatic review and potential SAR filing.",
+        "rules": [
+            {
+                "id": "POL-004.1",
+                "description": "Flagged bank-statement transactions reviewed before a decision",
+                "when": "status in [\"Decision\", \"Approved\"]",
+                "require": "pendingFlaggedStatements == 0"
+            }
+        ]
     },
     {
         "id": "POL-005",
         "title": "Periodic Review Requirements",
-        "clause": "Customer profiles must be reviewed annually for standard tier, semi-annually for premium tier, and quarterly for VIP tier customers."
+        "clause": "Customer profiles must be reviewed annually for standard tier, semi-annually for premium tier, and quarterly for VIP tier customers.",
+        "rules": [
+            {
+                "id": "POL-005.1",
+                "description": "Standard tier reviewed annually",
+                "when": "tier == \"Standard\" and status == \"Monitoring\"",
+                "require": "reviewAgeDays <= 366"
+            },
+            {
+                "id": "POL-005.2",
+                "description": "Premium tier reviewed semi-annually",
+                "when": "tier == \"Premium\" and status == \"Monitoring\"",
+                "require": "reviewAgeDays <= 183"
+            },
+            {
+                "id": "POL-005.3",
+                "description": "VIP tier reviewed quarterly",
+                "when": "tier == \"VIP\" and status == \"Monitoring\"",
+                "require": "reviewAgeDays <= 92"
+            }
+        ]
     }
 ]
 
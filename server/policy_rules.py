@@ -0,0 +1,487 @@
+"""Compiled policy rules evaluated over columnar case attributes"""
+
+import datetime
+import re
+import threading
+import time
+
+import numpy as np
+
+DAY = 86400.0
+
+
+class PolicyRuleError(ValueError):
+    pass
+
+
+def _timestamp(value):
+    if not value:
+        return np.nan
+    try:
+        return datetime.datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return np.nan
+
+
+def _latest_review(case):
+    """Most recent review activity on a case: creation, statement or occupation-form review"""
+    times = [_timestamp(case.get('createdAt'))]
+    times += [_timestamp(s.get('reviewDate')) for s in case.get('bankStatements') or []]
+    times.append(_timestamp((case.get('occupationForm') or {}).get('reviewDate')))
+    times = [t for t in times if t == t]
+    return max(times) if times else np.nan
+
+
+def _check_results(case):
+    """Latest result per check type"""
+    return {check.get('type'): check.get('result') for check in case.get('checks') or []}
+
+
+def _pending_flagged_statements(case):
+    return sum(
+        1 for s in case.get('bankStatements') or []
+        if s.get('flaggedTransactions') and s.get('reviewStatus') != 'Approved'
+    )
+
+
+# Rule fields: name -> (kind, extractor). 'number' and 'category' columns
+# compare directly; 'age' columns hold a timestamp and compare as days
+# elapsed at evaluation time, so they go stale without any mutation.
+FIELDS = {
+    'riskScore': ('number', lambda case: case.get('riskScore')),
+    'status': ('category', lambda case: case.get('status')),
+    'tier': ('category', lambda case: (case.get('customer') or {}).get('tier')),
+    'isWealthCustomer': ('number', lambda case: bool((case.get('customer') or {}).get('isWealthCustomer'))),
+    'documents': ('number', lambda case: len(case.get('documents') or [])),
+    'pendingFlaggedStatements': ('number', _pending_flagged_statements),
+    'ageDays': ('age', lambda case: _timestamp(case.get('createdAt'))),
+    'reviewAgeDays': ('age', _latest_review),
+}
+
+# Parameterised fields, written name("argument"): name -> (kind, extractor
+# returning a dict looked up by argument). The extractor runs once per case
+# however many arguments the rules use.
+PARAM_FIELDS = {
+    'check': ('category', _check_results),
+}
+
+
+# DSL parsing -----------------------------------------------------------
+
+TOKEN = re.compile(r'''
+    \s*(?:
+        (?P<number>-?\d+(?:\.\d+)?)
+      | (?P<string>"[^"]*"|'[^']*')
+      | (?P<op>==|!=|<=|>=|<|>|\(|\)|\[|\]|,)
+      | (?P<name>[A-Za-z_]\w*)
+    )''', re.X)
+
+KEYWORDS = {'and', 'or', 'not', 'in', 'true', 'false'}
+
+
+def tokenize(text):
+    tokens, pos = [], 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = TOKEN.match(text, pos)
+        if not match:
+            raise PolicyRuleError(f"Unexpected input at {pos} in {text!r}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == 'number':
+            value = float(value)
+        elif kind == 'string':
+            value = value[1:-1]
+        elif kind == 'name' and value in KEYWORDS:
+            kind = 'keyword'
+        tokens.append((kind, value))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    """
+    Recursive-descent parser producing a small AST:
+
+        expr    := and ('or' and)*
+        and     := not ('and' not)*
+        not     := 'not' not | '(' expr ')' | compare
+        compare := field (op literal | ['not'] 'in' '[' literal (',' literal)* ']')
+        field   := name | name '(' string ')'
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.pos = 0
+
+    def peek(self, value=None):
+        if self.pos >= len(self.tokens):
+            return None
+        token = self.tokens[self.pos]
+        return token if value is None or token[1] == value else None
+
+    def take(self, value=None):
+        token = self.peek(value)
+        if token is None:
+            expected = repr(value) if value else 'more input'
+            raise PolicyRuleError(f"Expected {expected} in {self.text!r}")
+        self.pos += 1
+        return token
+
+    def parse(self):
+        node = self.expr()
+        if self.pos != len(self.tokens):
+            raise PolicyRuleError(f"Unexpected {self.tokens[self.pos][1]!r} in {self.text!r}")
+        return node
+
+    def expr(self):
+        node = self.conjunction()
+        while self.peek('or'):
+            self.take()
+            node = ('or', node, self.conjunction())
+        return node
+
+    def conjunction(self):
+        node = self.negation()
+        while self.peek('and'):
+            self.take()
+            node = ('and', node, self.negation())
+        return node
+
+    def negation(self):
+        if self.peek('not'):
+            self.take()
+            return ('not', self.negation())
+        if self.peek('('):
+            self.take()
+            node = self.expr()
+            self.take(')')
+            return node
+        return self.compare()
+
+    def literal(self):
+        kind, value = self.take()
+        if kind in ('number', 'string'):
+            return value
+        if kind == 'keyword' and value in ('true', 'false'):
+            return 1.0 if value == 'true' else 0.0
+        raise PolicyRuleError(f"Expected a literal, got {value!r} in {self.text!r}")
+
+    def field(self):
+        kind, name = self.take()
+        if kind != 'name':
+            raise PolicyRuleError(f"Expected a field, got {name!r} in {self.text!r}")
+        if name in PARAM_FIELDS:
+            self.take('(')
+            kind, argument = self.take()
+            if kind != 'string':
+                raise PolicyRuleError(f"{name}() takes a quoted argument in {self.text!r}")
+            self.take(')')
+            return f'{name}:{argument}'
+        if name not in FIELDS:
+            raise PolicyRuleError(f"Unknown field {name!r} in {self.text!r}")
+        return name
+
+    def compare(self):
+        field = self.field()
+        negate = False
+        if self.peek('not'):
+            self.take()
+            negate = True
+            if not self.peek('in'):
+                raise PolicyRuleError(f"Expected 'in' after 'not' in {self.text!r}")
+        if self.peek('in'):
+            self.take()
+            self.take('[')
+            values = [self.literal()]
+            while self.peek(','):
+                self.take()
+                values.append(self.literal())
+            self.take(']')
+            node = ('in', field, values)
+            return ('not', node) if negate else node
+        kind, op = self.take()
+        if kind != 'op' or op not in ('==', '!=', '<', '<=', '>', '>='):
+            raise PolicyRuleError(f"Expected a comparison after {field!r} in {self.text!r}")
+        return ('cmp', op, field, self.literal())
+
+
+def parse_rule(text):
+    return _Parser(text).parse()
+
+
+def _fields(node):
+    if node[0] in ('and', 'or'):
+        return _fields(node[1]) | _fields(node[2])
+    if node[0] == 'not':
+        return _fields(node[1])
+    return {node[2] if node[0] == 'cmp' else node[1]}
+
+
+# Columns ---------------------------------------------------------------
+
+class _Column:
+    """One case attribute for every row: float64 values, or int32 codes into a vocabulary"""
+
+    def __init__(self, key, capacity):
+        name, _, argument = key.partition(':')
+        self.param = name if argument else None
+        self.argument = argument
+        self.kind, self.extract = PARAM_FIELDS[name] if argument else FIELDS[name]
+        if self.kind == 'category':
+            self.vocab = {'': 0}
+            self.values = np.zeros(capacity, dtype=np.int32)
+        else:
+            self.values = np.full(capacity, np.nan)
+
+    def read(self, case, prepared):
+        """
+        ``case``'s value as stored in the column (float or vocabulary code);
+        ``prepared`` caches parameterised extractions for this case.
+        """
+        if self.param:
+            if self.param not in prepared:
+                prepared[self.param] = self.extract(case)
+            value = prepared[self.param].get(self.argument)
+        else:
+            value = self.extract(case)
+        if self.kind == 'category':
+            value = value or ''
+            code = self.vocab.get(value)
+            if code is None:
+                code = self.vocab[value] = len(self.vocab)
+            return code
+        return np.nan if value is None else float(value)
+
+    def grow(self, capacity):
+        fill = 0 if self.kind == 'category' else np.nan
+        extra = np.full(capacity - len(self.values), fill, dtype=self.values.dtype)
+        self.values = np.concatenate([self.values, extra])
+
+
+def _compile(node, columns):
+    """Turn an AST into ``predicate(rows, now) -> bool array`` over a row slice"""
+    op = node[0]
+    if op in ('and', 'or'):
+        left, right = _compile(node[1], columns), _compile(node[2], columns)
+        if op == 'and':
+            return lambda rows, now: left(rows, now) & right(rows, now)
+        return lambda rows, now: left(rows, now) | right(rows, now)
+    if op == 'not':
+        inner = _compile(node[1], columns)
+        return lambda rows, now: ~inner(rows, now)
+
+    field = node[2] if op == 'cmp' else node[1]
+    column = columns[field]
+    literals = node[2] if op == 'in' else [node[3]]
+    for literal in literals:
+        if column.kind == 'category' and not isinstance(literal, str):
+            raise PolicyRuleError(f"{field!r} compares with quoted strings, not {literal!r}")
+        if column.kind != 'category' and isinstance(literal, str):
+            raise PolicyRuleError(f"{field!r} compares with numbers, not {literal!r}")
+
+    if column.kind == 'category':
+        if op == 'in':
+            values = node[2]
+            return lambda rows, now: np.isin(
+                column.values[rows], [column.vocab.get(v, -1) for v in values]
+            )
+        _, cmp, _, literal = node
+        if cmp not in ('==', '!='):
+            raise PolicyRuleError(f"Only ==, != and in apply to {node[2]!r}")
+        if cmp == '==':
+            return lambda rows, now: column.values[rows] == column.vocab.get(literal, -1)
+        return lambda rows, now: column.values[rows] != column.vocab.get(literal, -1)
+
+    def read(rows, now):
+        values = column.values[rows]
+        return (now - values) / DAY if column.kind == 'age' else values
+
+    if op == 'in':
+        values = np.array(node[2], dtype=float)
+        return lambda rows, now: np.isin(read(rows, now), values)
+    _, cmp, _, literal = node
+    compare = {
+        '==': np.equal, '!=': np.not_equal, '<': np.less,
+        '<=': np.less_equal, '>': np.greater, '>=': np.greater_equal,
+    }[cmp]
+    return lambda rows, now: compare(read(rows, now), literal)
+
+
+class Rule:
+    """
+    A policy rule: cases matching ``when`` must satisfy ``require``.
+    A missing ``when`` applies the rule to every case.
+    """
+
+    def __init__(self, policy, spec):
+        self.id = spec['id']
+        self.policy_id = policy['id']
+        self.policy_title = policy['title']
+        self.description = spec.get('description', '')
+        self.when_text = spec.get('when')
+        self.require_text = spec['require']
+        self.when = parse_rule(self.when_text) if self.when_text else None
+        self.require = parse_rule(self.require_text)
+        self.fields = _fields(self.require) | (_fields(self.when) if self.when else set())
+
+    def compile(self, columns):
+        require = _compile(self.require, columns)
+        if self.when is None:
+            self.violated = lambda rows, now: ~require(rows, now)
+        else:
+            when = _compile(self.when, columns)
+            self.violated = lambda rows, now: when(rows, now) & ~require(rows, now)
+
+    def to_dict(self):
+        return {
+            "ruleId": self.id,
+            "policyId": self.policy_id,
+            "policyTitle": self.policy_title,
+            "description": self.description,
+            "when": self.when_text,
+            "require": self.require_text,
+        }
+
+
+class PolicyEngine:
+    """
+    Evaluates the rules attached to policies (``policy["rules"]``) against
+    the case book.
+
+    Only the case attributes rules refer to are extracted, into one numpy
+    column per attribute with a row per case. Rules compile to vectorized
+    predicates over those columns, so a full evaluation is a handful of
+    array operations per rule regardless of the number of cases. A
+    mutation re-extracts and re-evaluates just the touched case's row.
+    Rules on elapsed time (``ageDays``) change without mutations;
+    ``start_refresh`` re-evaluates everything periodically to catch them.
+    """
+
+    def __init__(self, policies, capacity=1024):
+        self.rules = [Rule(policy, spec) for policy in policies for spec in policy.get('rules', [])]
+        self._by_id = {rule.id: rule for rule in self.rules}
+        keys = set()
+        for rule in self.rules:
+            keys |= rule.fields
+        self._capacity = capacity
+        self._columns = {key: _Column(key, capacity) for key in sorted(keys)}
+        for rule in self.rules:
+            rule.compile(self._columns)
+        self._rows = {}          # case id -> row
+        self._ids = []           # row -> case id
+        # Outcomes: one row per rule, one column per case
+        self._violated = np.zeros((len(self.rules), capacity), dtype=bool)
+        self._last_evaluation = None
+        self._lock = threading.Lock()
+
+    def _row(self, case_id):
+        row = self._rows.get(case_id)
+        if row is None:
+            row = self._rows[case_id] = len(self._ids)
+            self._ids.append(case_id)
+            if row >= self._capacity:
+                self._capacity *= 2
+                for column in self._columns.values():
+                    column.grow(self._capacity)
+                grown = np.zeros((len(self.rules), self._capacity), dtype=bool)
+                grown[:, :row] = self._violated[:, :row]
+                self._violated = grown
+        return row
+
+    def _load(self, case):
+        row = self._row(case['id'])
+        prepared = {}
+        for column in self._columns.values():
+            column.values[row] = column.read(case, prepared)
+        return row
+
+    def _evaluate(self, rows, now):
+        for i, rule in enumerate(self.rules):
+            self._violated[i, rows] = rule.violated(rows, now)
+
+    def evaluate_all(self, now=None):
+        """Re-evaluate every rule over every case; returns the time taken in seconds"""
+        started = time.perf_counter()
+        now = time.time() if now is None else now
+        with self._lock:
+            self._evaluate(slice(0, len(self._ids)), now)
+            elapsed = time.perf_counter() - started
+            self._last_evaluation = {"at": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                                     "seconds": round(elapsed, 3), "cases": len(self._ids)}
+        return elapsed
+
+    def rebuild(self, cases):
+        """Load every case's attributes and evaluate from scratch (used at startup)"""
+        columns = list(self._columns.values())
+        with self._lock:
+            rows, buffers = [], [[] for _ in columns]
+            for case in cases:
+                rows.append(self._row(case['id']))
+                prepared = {}
+                for column, buffer in zip(columns, buffers):
+                    buffer.append(column.read(case, prepared))
+            for column, buffer in zip(columns, buffers):
+                column.values[rows] = buffer
+        self.evaluate_all()
+
+    def update_case(self, case, now=None):
+        """Re-extract and re-evaluate a single case"""
+        now = time.time() if now is None else now
+        with self._lock:
+            row = self._load(case)
+            self._evaluate(slice(row, row + 1), now)
+
+    def on_event(self, event, case):
+        """Event-log listener: any mutation may change the case's rule outcomes"""
+        if case is not None:
+            self.update_case(case)
+
+    def start_refresh(self, interval=300):
+        """Re-evaluate all rules every ``interval`` seconds on a daemon thread"""
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.evaluate_all()
+                except Exception as e:
+                    print(f"Error evaluating policy rules: {e}")
+
+        threading.Thread(target=run, name='policy-refresh', daemon=True).start()
+
+    # Queries ----------------------------------------------------------
+
+    def case_violations(self, case_id):
+        """Rule details for every rule a case currently violates, or None for an unknown case"""
+        with self._lock:
+            row = self._rows.get(case_id)
+            if row is None:
+                return None
+            violated = np.flatnonzero(self._violated[:, row])
+        return [self.rules[i].to_dict() for i in violated]
+
+    def violations(self, policy_id=None, limit=50, offset=0):
+        """(total, per-rule counts, page of {caseId, ruleIds}) over cases in violation"""
+        selected = [i for i, rule in enumerate(self.rules) if policy_id in (None, rule.policy_id)]
+        with self._lock:
+            n = len(self._ids)
+            outcomes = self._violated[:, :n]
+            counts = {rule.id: int(total) for rule, total in zip(self.rules, outcomes.sum(axis=1))}
+            rows = np.flatnonzero(outcomes[selected].any(axis=0)) if selected else np.zeros(0, dtype=int)
+            page = [
+                {"caseId": self._ids[row],
+                 "ruleIds": [self.rules[i].id for i in selected if outcomes[i, row]]}
+                for row in rows[offset:offset + limit]
+            ]
+        return len(rows), counts, page
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rules": len(self.rules),
+                "columns": sorted(self._columns),
+                "cases": len(self._ids),
+                "casesInViolation": int(self._violated[:, :len(self._ids)].any(axis=0).sum()),
+                "lastFullEvaluation": self._last_evaluation,
+            }
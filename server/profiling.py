@@ -0,0 +1,250 @@
+"""Opt-in request profiling: cProfile on demand, sampled stacks for slow requests"""
+
+import collections
+import cProfile
+import io
+import itertools
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+
+from flask import g, has_request_context, request
+
+from audit_log import utc_now
+
+
+def _frame_stack(frame):
+    """Collapsed-stack representation of a frame, root first"""
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(parts))
+
+
+class StackSampler:
+    """
+    Background thread sampling the stacks of registered request threads,
+    and of worker threads while they run a job on a request's behalf.
+
+    Sleeps on an event while no request is in flight, so an idle server
+    pays nothing; otherwise takes one ``sys._current_frames()`` snapshot
+    per ``interval`` and counts the collapsed stack of each active thread.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self._active = {}  # thread ident -> Counter of collapsed stacks
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def start(self, ident, counter=None):
+        """Sample thread ``ident`` into ``counter`` (a new one unless given)"""
+        if counter is None:
+            counter = collections.Counter()
+        with self._lock:
+            self._active[ident] = counter
+        self._wake.set()
+        return counter
+
+    def stop(self, ident):
+        with self._lock:
+            counter = self._active.pop(ident, None)
+            if not self._active:
+                self._wake.clear()
+        return counter
+
+    def _run(self):
+        own = threading.get_ident()
+        while True:
+            self._wake.wait()
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, counter in self._active.items():
+                    frame = frames.get(ident)
+                    if frame is not None and ident != own:
+                        counter[_frame_stack(frame)] += 1
+            del frames
+            time.sleep(self.interval)
+
+
+class _JobProfiles:
+    """cProfile results of worker jobs run for one request, until it ends"""
+
+    def __init__(self):
+        self.open = True
+        self._profiles = []
+        self._lock = threading.Lock()
+
+    def add(self, profile):
+        with self._lock:
+            if self.open:
+                self._profiles.append(profile)
+
+    def close(self):
+        with self._lock:
+            self.open = False
+            return self._profiles
+
+
+class RequestProfiler:
+    """
+    Flask extension capturing profiles for selected and slow requests.
+
+    Nothing is registered unless ``enabled``, so a disabled profiler adds
+    no per-request work. When enabled:
+
+    - requests carrying ``header`` (e.g. ``X-Profile: 1``) or picked by
+      ``sample_rate`` are run under cProfile;
+    - every request's thread is stack-sampled, and requests slower than
+      ``slow_ms`` (or explicitly profiled) are kept in a ring buffer of
+      ``keep`` entries with their collapsed stacks.
+
+    Jobs a request hands to a ``PriorityScheduler`` (``scheduler.wrap =
+    profiler.wrap_job``) are sampled, and cProfiled, into the same capture
+    while they run on their worker thread, so an upload's capture shows the
+    classification / OCR work instead of just ``Future.result()``. Jobs
+    still running when the request ends (bulk uploads) are only covered up
+    to that point.
+    """
+
+    def __init__(self, enabled=False, sample_rate=0.0, slow_ms=1000.0,
+                 header='X-Profile', keep=50, interval=0.005):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.header = header
+        self.sampler = None
+        self.interval = interval
+        self._captures = collections.deque(maxlen=keep)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, environ=None):
+        env = os.environ if environ is None else environ
+        return cls(
+            enabled=env.get('KYC_PROFILE', '0').lower() in ('1', 'true'),
+            sample_rate=float(env.get('KYC_PROFILE_SAMPLE_RATE', '0')),
+            slow_ms=float(env.get('KYC_SLOW_REQUEST_MS', '1000')),
+            keep=int(env.get('KYC_PROFILE_KEEP', '50')),
+            interval=float(env.get('KYC_PROFILE_INTERVAL_MS', '5')) / 1000,
+        )
+
+    def init_app(self, app):
+        if not self.enabled:
+            return
+        self.sampler = StackSampler(self.interval)
+        app.before_request(self._before)
+        app.teardown_request(self._teardown)
+
+    def _before(self):
+        g._profile_start = time.perf_counter()
+        g._profile_stacks = self.sampler.start(threading.get_ident())
+        g._profile_cprofile = None
+        g._profile_jobs = _JobProfiles()
+        if request.headers.get(self.header) or random.random() < self.sample_rate:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+                g._profile_cprofile = profile
+            except ValueError:
+                # Another profiler is already active on this interpreter
+                pass
+
+    def _teardown(self, exc):
+        start = g.pop('_profile_start', None)
+        if start is None:
+            return
+        duration_ms = 1000 * (time.perf_counter() - start)
+        self.sampler.stop(threading.get_ident())
+        stacks = g.pop('_profile_stacks', None)
+        profile = g.pop('_profile_cprofile', None)
+        jobs = g.pop('_profile_jobs', None)
+        if profile is not None:
+            profile.disable()
+        job_profiles = jobs.close() if jobs is not None else []
+
+        if profile is None and duration_ms < self.slow_ms:
+            return
+
+        capture = {
+            "id": next(self._ids),
+            "at": utc_now(),
+            "method": request.method,
+            "path": request.path,
+            "endpoint": request.endpoint,
+            "durationMs": round(duration_ms, 1),
+            "trigger": "slow" if duration_ms >= self.slow_ms else "requested",
+            "samples": sum(stacks.values()) if stacks else 0,
+            "collapsed": dict(stacks.most_common()) if stacks else {},
+            "cprofile": None,
+        }
+        if profile is not None:
+            out = io.StringIO()
+            stats = pstats.Stats(profile, stream=out)
+            for job_profile in job_profiles:
+                stats.add(job_profile)
+            stats.sort_stats('cumulative').print_stats(40)
+            capture["cprofile"] = out.getvalue()
+        with self._lock:
+            self._captures.append(capture)
+
+    def wrap_job(self, fn):
+        """
+        ``PriorityScheduler`` wrap hook: outside a profiled request returns
+        ``fn`` unchanged, otherwise a callable that samples (and cProfiles,
+        if the request is) its worker thread into the request's capture.
+        """
+        if not self.enabled or not has_request_context() or '_profile_start' not in g:
+            return fn
+        sampler = self.sampler
+        stacks = g._profile_stacks
+        jobs = g._profile_jobs
+        cprofiled = g._profile_cprofile is not None
+
+        def run(*args, **kwargs):
+            ident = threading.get_ident()
+            if not jobs.open:
+                return fn(*args, **kwargs)
+            sampler.start(ident, stacks)
+            profile = None
+            if cprofiled:
+                profile = cProfile.Profile()
+                try:
+                    profile.enable()
+                except ValueError:
+                    # Python 3.12+: the request's profiler already sees every thread
+                    profile = None
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                if profile is not None:
+                    profile.disable()
+                    jobs.add(profile)
+                sampler.stop(ident)
+        return run
+
+    def list(self):
+        """Recent captures, newest first, without the bulky profile bodies"""
+        with self._lock:
+            captures = list(self._captures)
+        return [
+            {k: v for k, v in c.items() if k not in ('collapsed', 'cprofile')}
+            for c in reversed(captures)
+        ]
+
+    def get(self, capture_id):
+        with self._lock:
+            return next((c for c in self._captures if c["id"] == capture_id), None)
+
+    @staticmethod
+    def collapsed_text(capture):
+        """Brendan Gregg collapsed-stack format: 'frame;frame;frame count' per line"""
+        return ''.join(f"{stack} {count}\n" for stack, count in capture["collapsed"].items())
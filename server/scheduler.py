@@ -0,0 +1,187 @@
+"""Weighted-fair priority scheduler for document processing"""
+
+import collections
+import datetime
+import threading
+import time
+from concurrent.futures import Future
+
+# Priority classes, most urgent first, with their share of worker time
+PRIORITY_WEIGHTS = {
+    'vip': 8,
+    'premium': 4,
+    'standard': 1,
+}
+
+# Workflow stages where a stuck document blocks a decision, so get a bump
+URGENT_STAGES = {'Decision', 'Screening'}
+
+
+def case_priority(case, age_boost_days=7, now=None):
+    """
+    Priority class for a case's document work.
+
+    Base class comes from ``customer.tier`` and ``isWealthCustomer``; cases
+    that are waiting on a decision stage are promoted one class. Cases older
+    than ``age_boost_days`` are promoted too, but age alone never reaches
+    ``vip``, so a backlog of old cases can't crowd out real VIP work.
+    """
+    customer = case.get('customer') or {}
+    tier = customer.get('tier')
+    if tier == 'VIP':
+        return 'vip'
+    level = 1 if tier == 'Premium' or customer.get('isWealthCustomer') else 2
+
+    if case.get('status') in URGENT_STAGES:
+        level -= 1
+    elif level == 2 and case.get('createdAt'):
+        try:
+            created = datetime.datetime.fromisoformat(case['createdAt'].replace('Z', '+00:00'))
+            now = now or datetime.datetime.now(datetime.timezone.utc)
+            if (now - created).days >= age_boost_days:
+                level -= 1
+        except ValueError:
+            pass
+    return list(PRIORITY_WEIGHTS)[level]
+
+
+class _ClassStats:
+    def __init__(self, keep):
+        self.waits = collections.deque(maxlen=keep)
+        self.submitted = 0
+        self.completed = 0
+        self.promoted = 0
+
+
+class PriorityScheduler:
+    """
+    Run submitted jobs on a fixed pool of workers, picking the next job by
+    stride scheduling over per-class FIFO queues.
+
+    Each class advances a virtual "pass" by ``1 / weight`` every time it is
+    served, and the non-empty class with the lowest pass goes next, so
+    under load classes get worker time in proportion to their weights.
+    Starvation protection: if the head job of any class has waited longer
+    than ``max_wait`` seconds, the oldest such job is served first, but at
+    most once every ``override_every`` picks. Under sustained overload every
+    queue is past ``max_wait``; the limit keeps the weighted order for the
+    other picks instead of degenerating into plain FIFO.
+
+    ``wrap(fn)``, if given, is called in the submitting thread and returns
+    the callable the worker runs instead, so per-request state such as a
+    profiling capture can follow the job onto its worker thread.
+    """
+
+    def __init__(self, workers=4, weights=None, max_wait=30.0, keep=1000, override_every=4,
+                 wrap=None):
+        self.weights = dict(weights or PRIORITY_WEIGHTS)
+        self.wrap = wrap
+        self.max_wait = max_wait
+        self.override_every = override_every
+        self._since_override = override_every
+        self._queues = {name: collections.deque() for name in self.weights}
+        self._pass = {name: 0.0 for name in self.weights}
+        self._stats = {name: _ClassStats(keep) for name in self.weights}
+        self._cond = threading.Condition()
+        self._running = 0
+        self._shutdown = False
+        self._workers = [
+            threading.Thread(target=self._work, name=f'doc-worker-{i}', daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, priority, fn, *args, **kwargs):
+        """Queue ``fn(*args, **kwargs)`` under a priority class and return a Future"""
+        if priority not in self._queues:
+            priority = list(self.weights)[-1]
+        if self.wrap is not None:
+            fn = self.wrap(fn)
+        future = Future()
+        with self._cond:
+            queue = self._queues[priority]
+            if not queue:
+                # A class that was idle rejoins at the current minimum pass,
+                # so it can't bank credit while it had nothing to run
+                active = [self._pass[name] for name, q in self._queues.items() if q]
+                self._pass[priority] = max(self._pass[priority], min(active, default=0.0))
+            queue.append((time.monotonic(), future, fn, args, kwargs))
+            self._stats[priority].submitted += 1
+            self._cond.notify()
+        return future
+
+    def _next(self):
+        now = time.monotonic()
+        name = min((self._pass[n], -self.weights[n], n) for n, q in self._queues.items() if q)[2]
+        self._since_override += 1
+        if self._since_override >= self.override_every:
+            starved = [
+                (queue[0][0], n) for n, queue in self._queues.items()
+                if queue and now - queue[0][0] > self.max_wait
+            ]
+            if starved and min(starved)[1] != name:
+                name = min(starved)[1]
+                self._stats[name].promoted += 1
+                self._since_override = 0
+        self._pass[name] += 1.0 / self.weights[name]
+        enqueued, future, fn, args, kwargs = self._queues[name].popleft()
+        self._stats[name].waits.append(now - enqueued)
+        return name, future, fn, args, kwargs
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._shutdown and not any(self._queues.values()):
+                    self._cond.wait()
+                if self._shutdown:
+                    return
+                name, future, fn, args, kwargs = self._next()
+                self._running += 1
+
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+
+            with self._cond:
+                self._running -= 1
+                self._stats[name].completed += 1
+
+    def pending(self):
+        """Jobs queued but not yet started, across all classes"""
+        with self._cond:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def shutdown(self):
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+
+    def stats(self):
+        """Queue depth and wait-time statistics per priority class"""
+        with self._cond:
+            now = time.monotonic()
+            classes = {}
+            for name, queue in self._queues.items():
+                stats = self._stats[name]
+                waits = sorted(stats.waits)
+                classes[name] = {
+                    "weight": self.weights[name],
+                    "queueDepth": len(queue),
+                    "oldestWaitMs": round(1000 * (now - queue[0][0]), 1) if queue else 0,
+                    "submitted": stats.submitted,
+                    "completed": stats.completed,
+                    "starvationPromotions": stats.promoted,
+                    "waitMeanMs": round(1000 * sum(waits) / len(waits), 1) if waits else 0,
+                    "waitP95Ms": round(1000 * waits[min(len(waits) - 1, int(len(waits) * 0.95))], 1) if waits else 0,
+                    "waitMaxMs": round(1000 * waits[-1], 1) if waits else 0,
+                }
+            return {
+                "workers": len(self._workers),
+                "running": self._running,
+                "maxWaitSeconds": self.max_wait,
+                "overrideEvery": self.override_every,
+                "classes": classes,
+            }
@@ -0,0 +1,257 @@
+"""Incrementally maintained inverted index over case customer fields and document OCR output"""
+
+import bisect
+import math
+import re
+import threading
+
+TOKEN = re.compile(r'[a-z0-9]+')
+
+# OCR fields worth searching, mapped to their query field names
+OCR_FIELDS = {
+    'Name': 'name',
+    'Occupation': 'occupation',
+    'FIN': 'fin',
+    'date_of_application': 'date_of_application',
+    'date_of_issue': 'date_of_issue',
+    'date_of_expiry': 'date_of_expiry',
+    'extracted_text': 'text',
+}
+
+# Identifier-like fields are also indexed as one whole-value term, so
+# FIN:G1234567N or dob:1985-03-15 match exactly rather than token by token
+KEYWORD_FIELDS = {'fin', 'dob', 'id', 'case', 'date_of_application', 'date_of_issue', 'date_of_expiry'}
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text):
+    return TOKEN.findall(str(text).lower())
+
+
+def analyze(field, value):
+    """Terms for a field value, with keyword fields also contributing their whole value"""
+    if value is None or value == '':
+        return []
+    terms = tokenize(value)
+    if field in KEYWORD_FIELDS:
+        whole = str(value).strip().lower()
+        if whole and whole not in terms:
+            terms.append(whole)
+    return terms
+
+
+def case_fields(case):
+    """Searchable fields of a case record (customer details)"""
+    customer = case.get('customer') or {}
+    return {
+        'case': case.get('id'),
+        'name': customer.get('name'),
+        'dob': customer.get('dob'),
+        'address': customer.get('address'),
+        'tier': customer.get('tier'),
+        'status': case.get('status'),
+    }
+
+
+def document_fields(case, doc):
+    """Searchable fields of a document: metadata plus OCR output"""
+    fields = {
+        'case': case.get('id'),
+        'id': doc.get('id'),
+        'filename': doc.get('name'),
+        'type': doc.get('type'),
+        'category': doc.get('category'),
+    }
+    classification = doc.get('classification') or {}
+    if classification.get('document_type'):
+        fields['doctype'] = classification['document_type']
+    ocr = doc.get('ocr_result') or {}
+    for key, field in OCR_FIELDS.items():
+        if ocr.get(key):
+            fields[field] = ocr[key]
+    return fields
+
+
+def parse_query(query):
+    """
+    Split a query into clauses of (field or None, term, is_prefix).
+
+    ``FIN:G123`` scopes a term to a field, a trailing ``*`` makes it a
+    prefix match, and double quotes keep a multi-word field value together
+    (``Name:"John Smith"`` becomes two name-scoped clauses).
+    """
+    clauses = []
+    for match in re.finditer(r'(?:(\w+):)?(?:"([^"]*)"|(\S+))', query):
+        field, quoted, bare = match.groups()
+        field = field.lower() if field else None
+        raw = quoted if quoted is not None else bare
+        prefix = raw.endswith('*')
+        raw = raw.rstrip('*')
+        if field in KEYWORD_FIELDS and raw.strip():
+            clauses.append((field, raw.strip().lower(), prefix))
+            continue
+        terms = tokenize(raw)
+        for i, term in enumerate(terms):
+            clauses.append((field, term, prefix and i == len(terms) - 1))
+    return clauses
+
+
+class SearchIndex:
+    """
+    Inverted index keyed by ``(case_id, doc_id)``, with ``doc_id`` None for
+    the case record itself.
+
+    Postings are kept per ``field:term`` and per bare term (any field), with
+    term frequencies for BM25 ranking. A forward index of each entry's terms
+    makes updates and deletes incremental. Prefix queries use sorted term
+    lists, one for bare terms and one for ``field:term`` terms so ``na*``
+    can't match ``name:...``, merged lazily from newly seen terms; indexing
+    stays O(terms) and a prefix lookup is a bisect plus a short scan.
+    """
+
+    def __init__(self):
+        self._postings = {}   # term -> {key: tf}
+        self._forward = {}    # key -> {term: tf}
+        self._lengths = {}    # key -> number of tokens
+        self._total_length = 0
+        self._vocab = {'bare': set(), 'field': set()}
+        self._sorted_terms = {'bare': [], 'field': []}
+        self._new_terms = {'bare': set(), 'field': set()}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._forward)
+
+    # Indexing ---------------------------------------------------------
+
+    def index(self, key, fields):
+        """Add or replace the entry for ``key`` with the given field values"""
+        counts = {}
+        kinds = {}
+        length = 0
+        for field, value in fields.items():
+            for term in analyze(field, value):
+                for indexed_term, kind in ((f"{field}:{term}", 'field'), (term, 'bare')):
+                    counts[indexed_term] = counts.get(indexed_term, 0) + 1
+                    kinds[indexed_term] = kind
+                length += 1
+
+        with self._lock:
+            self._remove(key)
+            for term, tf in counts.items():
+                self._postings.setdefault(term, {})[key] = tf
+                vocab = self._vocab[kinds[term]]
+                if term not in vocab:
+                    vocab.add(term)
+                    self._new_terms[kinds[term]].add(term)
+            self._forward[key] = counts
+            self._lengths[key] = length
+            self._total_length += length
+
+    def remove(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key):
+        counts = self._forward.pop(key, None)
+        if counts is None:
+            return
+        for term in counts:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(key, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._lengths.pop(key, 0)
+
+    def index_case(self, case):
+        """(Re)index a case record and all of its documents"""
+        self.index((case['id'], None), case_fields(case))
+        for doc in case.get('documents', []):
+            self.index((case['id'], doc['id']), document_fields(case, doc))
+
+    def on_event(self, event, case):
+        """Event-log listener keeping the index in step with mutations"""
+        if case is None:
+            return
+        case_id = case['id']
+        if event['type'] == 'DocumentDeleted':
+            self.remove((case_id, event['payload']['documentId']))
+            self.index((case_id, None), case_fields(case))
+        elif event['type'] in ('DocumentAdded', 'DocumentsIngested'):
+            new_ids = {d['id'] for d in event['payload'].get('documents') or [event['payload']['document']]}
+            for doc in case.get('documents', []):
+                if doc['id'] in new_ids:
+                    self.index((case_id, doc['id']), document_fields(case, doc))
+            self.index((case_id, None), case_fields(case))
+        else:
+            self.index((case_id, None), case_fields(case))
+
+    # Querying ---------------------------------------------------------
+
+    def _expand(self, term, prefix, kind='bare'):
+        if not prefix:
+            return [term] if term in self._postings else []
+        new_terms = self._new_terms[kind]
+        if new_terms:
+            # Two sorted runs: timsort merges them in linear time. Terms
+            # whose postings emptied are dropped from the vocabulary here.
+            vocab = self._vocab[kind]
+            kept = []
+            for t in self._sorted_terms[kind]:
+                if t in self._postings:
+                    kept.append(t)
+                else:
+                    vocab.discard(t)
+            self._sorted_terms[kind] = sorted(kept + sorted(new_terms))
+            self._new_terms[kind] = set()
+        sorted_terms = self._sorted_terms[kind]
+        terms = []
+        for i in range(bisect.bisect_left(sorted_terms, term), len(sorted_terms)):
+            t = sorted_terms[i]
+            if not t.startswith(term):
+                break
+            if t in self._postings:
+                terms.append(t)
+        return terms
+
+    def search(self, query, limit=20, offset=0):
+        """
+        Run a query; every clause must match. Returns (total, hits) where
+        hits are ``{"caseId", "documentId", "score"}`` sorted by BM25 score.
+        """
+        clauses = parse_query(query)
+        if not clauses:
+            return 0, []
+
+        with self._lock:
+            n = len(self._forward) or 1
+            avg_length = (self._total_length / n) or 1
+            scores = None
+            for field, term, prefix in clauses:
+                lookup = f"{field}:{term}" if field else term
+                clause_scores = {}
+                for expanded in self._expand(lookup, prefix, 'field' if field else 'bare'):
+                    postings = self._postings[expanded]
+                    idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for key, tf in postings.items():
+                        if scores is not None and key not in scores:
+                            continue
+                        norm = tf * (K1 + 1) / (tf + K1 * (1 - B + B * self._lengths[key] / avg_length))
+                        clause_scores[key] = max(clause_scores.get(key, 0.0), idf * norm)
+                if scores is None:
+                    scores = clause_scores
+                else:
+                    scores = {key: scores[key] + s for key, s in clause_scores.items()}
+                if not scores:
+                    return 0, []
+
+        ranked = sorted(scores.items(), key=lambda item: -item[1])
+        hits = [
+            {"caseId": case_id, "documentId": doc_id, "score": round(score, 4)}
+            for (case_id, doc_id), score in ranked[offset:offset + limit]
+        ]
+        return len(ranked), hits
@@ -0,0 +1,207 @@
+"""Incrementally maintained dashboard aggregates"""
+
+import collections
+import threading
+import time
+
+from audit_log import utc_now
+
+# Case status -> workflow stage (node ids from mock_data.WORKFLOW)
+STATUS_STAGES = {
+    'Ingestion': 'ingestion',
+    'Intake': 'intake',
+    'Identity': 'idv',
+    'Identity Verification': 'idv',
+    'Screening': 'screen',
+    'Decision': 'decision',
+    'Approved': 'decision',
+    'Rejected': 'decision',
+    'Monitoring': 'monitor',
+}
+
+RISK_BUCKETS = 10
+
+PENDING_REVIEW = {'Pending Review', 'Under Review', 'Additional Info Required'}
+
+
+def case_contribution(case):
+    """The counters a single case adds to the aggregates"""
+    customer = case.get('customer') or {}
+    status = case.get('status')
+    risk = case.get('riskScore') or 0.0
+    bucket = min(int(risk * RISK_BUCKETS), RISK_BUCKETS - 1)
+    contribution = collections.Counter({
+        ('cases', 'total'): 1,
+        ('status', status): 1,
+        ('stage', STATUS_STAGES.get(status, 'other')): 1,
+        ('risk', bucket): 1,
+        ('tier', customer.get('tier') or 'Unknown'): 1,
+        ('wealth', 'wealth' if customer.get('isWealthCustomer') else 'standard'): 1,
+        ('documents', 'total'): len(case.get('documents') or []),
+    })
+    for statement in case.get('bankStatements') or []:
+        contribution[('bankStatements', 'total')] += 1
+        if statement.get('reviewStatus') in PENDING_REVIEW:
+            contribution[('bankStatements', 'pendingReview')] += 1
+    form = case.get('occupationForm')
+    if form:
+        contribution[('occupationForms', 'total')] += 1
+        if form.get('reviewStatus') in PENDING_REVIEW:
+            contribution[('occupationForms', 'pendingReview')] += 1
+    return contribution
+
+
+class DashboardStats:
+    """
+    Dashboard counters kept up to date from event-log mutations.
+
+    Each case's last contribution is remembered, so a mutation costs one
+    recomputation of that case and a delta against the totals; reading the
+    aggregates never walks the store. ``recompute`` rebuilds everything
+    from scratch and reports how far the incremental totals had drifted;
+    ``start_recompute`` runs it periodically in the background.
+    """
+
+    def __init__(self, throughput_window=3600):
+        self.throughput_window = throughput_window
+        self._totals = collections.Counter()
+        self._contributions = {}
+        self._processed = 0
+        self._per_minute = collections.deque()  # (minute, documents processed)
+        self._last_recompute = None
+        self._last_drift = None
+        self._touched = None  # case ids updated while a recompute is scanning
+        self._lock = threading.Lock()
+
+    def _apply(self, case):
+        new = case_contribution(case)
+        old = self._contributions.get(case['id'])
+        self._contributions[case['id']] = new
+        if self._touched is not None:
+            self._touched.add(case['id'])
+        self._totals.update(new)
+        if old:
+            self._totals.subtract(old)
+
+    def rebuild(self, cases):
+        """Compute all aggregates from scratch (used at startup)"""
+        with self._lock:
+            self._totals = collections.Counter()
+            self._contributions = {}
+            for case in cases:
+                self._apply(case)
+
+    def on_event(self, event, case):
+        """Event-log listener: update the touched case and processing throughput"""
+        if case is None:
+            return
+        with self._lock:
+            self._apply(case)
+            payload = event['payload']
+            if event['type'] == 'DocumentAdded':
+                self._record_processed(1)
+            elif event['type'] == 'DocumentsIngested':
+                self._record_processed(len(payload['documents']))
+
+    def _record_processed(self, count):
+        minute = int(time.time() // 60)
+        self._processed += count
+        if self._per_minute and self._per_minute[-1][0] == minute:
+            self._per_minute[-1] = (minute, self._per_minute[-1][1] + count)
+        else:
+            self._per_minute.append((minute, count))
+        horizon = minute - self.throughput_window // 60
+        while self._per_minute and self._per_minute[0][0] <= horizon:
+            self._per_minute.popleft()
+
+    def recompute(self, cases):
+        """
+        Full recompute; returns the counters that had drifted (expected minus actual).
+
+        The scan runs without the lock, so mutations keep flowing. Cases
+        updated while it runs keep their incremental contribution (which is
+        at least as new as what the scan saw) instead of the scanned one.
+        """
+        with self._lock:
+            self._touched = set()
+        try:
+            fresh = collections.Counter()
+            contributions = {}
+            for case in list(cases):
+                contribution = case_contribution(case)
+                contributions[case['id']] = contribution
+                fresh.update(contribution)
+        except BaseException:
+            with self._lock:
+                self._touched = None
+            raise
+        with self._lock:
+            for case_id in self._touched:
+                scanned = contributions.get(case_id)
+                if scanned:
+                    fresh.subtract(scanned)
+                current = self._contributions[case_id]
+                contributions[case_id] = current
+                fresh.update(current)
+            self._touched = None
+            drift = {
+                f"{group}:{key}": fresh[(group, key)] - self._totals[(group, key)]
+                for group, key in set(fresh) | set(self._totals)
+                if fresh[(group, key)] != self._totals[(group, key)]
+            }
+            self._totals = fresh
+            self._contributions = contributions
+            self._last_recompute = utc_now()
+            self._last_drift = drift
+        if drift:
+            print(f"Dashboard stats drift corrected: {drift}")
+        return drift
+
+    def start_recompute(self, cases, interval=300):
+        """Recompute from ``cases`` every ``interval`` seconds on a daemon thread"""
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.recompute(cases)
+                except Exception as e:
+                    print(f"Error recomputing dashboard stats: {e}")
+
+        threading.Thread(target=run, name='stats-recompute', daemon=True).start()
+
+    def to_dict(self):
+        with self._lock:
+            groups = collections.defaultdict(dict)
+            for (group, key), value in self._totals.items():
+                if value:
+                    groups[group][key] = value
+            histogram = [
+                {"from": i / RISK_BUCKETS, "to": (i + 1) / RISK_BUCKETS,
+                 "count": self._totals[('risk', i)]}
+                for i in range(RISK_BUCKETS)
+            ]
+            now_minute = int(time.time() // 60)
+            last_hour = sum(count for minute, count in self._per_minute if minute > now_minute - 60)
+            return {
+                "totalCases": self._totals[('cases', 'total')],
+                "byStatus": groups.get('status', {}),
+                "byStage": groups.get('stage', {}),
+                "byTier": groups.get('tier', {}),
+                "wealthBreakdown": groups.get('wealth', {}),
+                "riskHistogram": histogram,
+                "documents": self._totals[('documents', 'total')],
+                "pendingReviews": {
+                    "bankStatements": self._totals[('bankStatements', 'pendingReview')],
+                    "occupationForms": self._totals[('occupationForms', 'pendingReview')],
+                },
+                "documentProcessing": {
+                    "processedSinceStart": self._processed,
+                    "lastHour": last_hour,
+                    "perMinute": [
+                        {"minute": minute * 60, "count": count}
+                        for minute, count in list(self._per_minute)[-60:]
+                    ],
+                },
+                "lastRecompute": self._last_recompute,
+                "lastDrift": self._last_drift,
+            }
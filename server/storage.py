@@ -0,0 +1,248 @@
+"""Upload storage: collision-free IDs, hash-sharded layout, atomic writes and orphan sweeping"""
+
+import hashlib
+import os
+import re
+import secrets
+import threading
+import time
+import uuid
+
+# Crockford base32, as used by ULIDs (sortable, no ambiguous letters)
+ID_ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+
+TMP_DIR = '.tmp'
+CHUNK_SIZE = 1024 * 1024
+
+UPLOAD_NAME = re.compile(r'^(?P<case_id>C-\d+)_(?P<doc_id>DOC-[\w-]+)\.(?P<ext>\w+)$')
+
+_id_lock = threading.Lock()
+_last_ms = 0
+_last_random = 0
+
+
+def _encode(value, length):
+    chars = []
+    for _ in range(length):
+        value, digit = divmod(value, 32)
+        chars.append(ID_ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+def new_document_id():
+    """
+    A new ``DOC-<ulid>`` id: 48-bit millisecond timestamp plus 80 random
+    bits. Ids sort by creation time, and ids minted in the same millisecond
+    by this process increment the random part, so they never repeat.
+    """
+    global _last_ms, _last_random
+    with _id_lock:
+        now = int(time.time() * 1000)
+        if now <= _last_ms:
+            now = _last_ms
+            _last_random = (_last_random + 1) % (1 << 80)
+        else:
+            _last_random = secrets.randbits(80)
+        _last_ms = now
+        return f"DOC-{_encode(now, 10)}{_encode(_last_random, 16)}"
+
+
+class FileTooLarge(ValueError):
+    pass
+
+
+class UploadStore:
+    """
+    Uploaded files under ``root``, sharded into ``depth`` levels of two hex
+    characters taken from a hash of the file name (256 directories per
+    level), so no directory grows past a few thousand entries.
+
+    Files are streamed into ``root/.tmp`` and renamed into place only once
+    complete, so readers and the sweeper never see a partial file.
+    """
+
+    def __init__(self, root, depth=2):
+        self.root = root
+        self.depth = depth
+        self.tmp_dir = os.path.join(root, TMP_DIR)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def path_for(self, case_id, doc_id, extension):
+        name = f"{case_id}_{doc_id}.{extension}"
+        digest = hashlib.sha1(name.encode()).hexdigest()
+        shards = [digest[2 * i:2 * i + 2] for i in range(self.depth)]
+        return os.path.join(self.root, *shards, name)
+
+    def save(self, case_id, doc_id, extension, content, max_size=None):
+        """
+        Atomically store ``content`` (bytes or a file-like / FileStorage).
+        Returns (path, size); raises FileTooLarge as soon as ``max_size`` is
+        exceeded, leaving nothing behind.
+        """
+        path = self.path_for(case_id, doc_id, extension)
+        tmp_path = os.path.join(self.tmp_dir, f"{uuid.uuid4().hex}.part")
+        stream = getattr(content, 'stream', content)
+        size = 0
+        try:
+            with open(tmp_path, 'wb') as f:
+                if isinstance(content, bytes):
+                    size = len(content)
+                    if max_size is not None and size > max_size:
+                        raise FileTooLarge(size)
+                    f.write(content)
+                else:
+                    while True:
+                        chunk = stream.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        size += len(chunk)
+                        if max_size is not None and size > max_size:
+                            raise FileTooLarge(size)
+                        f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return path, size
+
+    def iter_files(self):
+        """Yield (path, DirEntry) for every stored file, including legacy flat ones and temp files"""
+        stack = [self.root]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            yield entry.path, entry
+            except FileNotFoundError:
+                continue
+
+
+class OrphanSweeper:
+    """
+    Background reclamation of upload files no document refers to.
+
+    ``live_paths()`` returns the file paths of every current document.
+    Files released explicitly (deleted documents, failed processing) are
+    removed first; a full scan every ``interval`` seconds also catches
+    leftovers from crashes; the scan only touches temp files and upload
+    files at their sharded location (never legacy flat files or anything
+    else under the root) older than ``min_age`` seconds, so uploads still
+    being processed are safe.
+
+    The sweeper never competes with foreground work: it examines at most
+    ``scan_rate`` files and deletes at most ``delete_rate`` files per
+    second, and pauses entirely while ``busy()`` is true.
+    """
+
+    def __init__(self, store, live_paths, busy=None, interval=3600, min_age=3600,
+                 scan_rate=200, delete_rate=20):
+        self.store = store
+        self.live_paths = live_paths
+        self.busy = busy or (lambda: False)
+        self.interval = interval
+        self.min_age = min_age
+        self.scan_rate = scan_rate
+        self.delete_rate = delete_rate
+        self._released = []
+        self._cond = threading.Condition()
+        self._stats = {"sweeps": 0, "scanned": 0, "reclaimedFiles": 0, "reclaimedBytes": 0,
+                       "errors": 0, "lastSweep": None, "lastSweepSeconds": None}
+        self._thread = None
+
+    def release(self, path):
+        """Mark a file as no longer referenced; the sweeper removes it unless a document still points at it"""
+        if path:
+            with self._cond:
+                self._released.append(path)
+                self._cond.notify()
+
+    def _pause(self, seconds):
+        time.sleep(seconds)
+        while self.busy():
+            time.sleep(0.5)
+
+    def _reclaim(self, path, live, now, min_age):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return False
+        if now - stat.st_mtime < min_age or os.path.abspath(path) in live:
+            return False
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"Error reclaiming upload {path}: {e}")
+            with self._cond:
+                self._stats["errors"] += 1
+            return False
+        with self._cond:
+            self._stats["reclaimedFiles"] += 1
+            self._stats["reclaimedBytes"] += stat.st_size
+        self._pause(1.0 / self.delete_rate)
+        return True
+
+    def _live(self):
+        return {os.path.abspath(p) for p in self.live_paths() if p}
+
+    def drain_released(self):
+        """Reclaim explicitly released files that are still unreferenced"""
+        with self._cond:
+            released, self._released = self._released, []
+        if released:
+            live, now = self._live(), time.time()
+            for path in released:
+                self._reclaim(path, live, now, min_age=0)
+
+    def sweep(self):
+        """One full, rate-limited pass over the store"""
+        started = time.monotonic()
+        live, now = self._live(), time.time()
+        scanned = 0
+        for path, entry in self.store.iter_files():
+            scanned += 1
+            if scanned % 10 == 0:
+                self._pause(10.0 / self.scan_rate)
+            if os.path.dirname(path) == self.store.tmp_dir:
+                self._reclaim(path, live, now, self.min_age)
+                continue
+            match = UPLOAD_NAME.match(entry.name)
+            if match and path == self.store.path_for(match['case_id'], match['doc_id'], match['ext']):
+                self._reclaim(path, live, now, self.min_age)
+        with self._cond:
+            self._stats["sweeps"] += 1
+            self._stats["scanned"] += scanned
+            self._stats["lastSweep"] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+            self._stats["lastSweepSeconds"] = round(time.monotonic() - started, 2)
+
+    def start(self):
+        def run():
+            next_sweep = time.monotonic() + min(self.interval, self.min_age)
+            while True:
+                with self._cond:
+                    self._cond.wait(timeout=max(0.0, min(60.0, next_sweep - time.monotonic())))
+                try:
+                    self.drain_released()
+                    if time.monotonic() >= next_sweep:
+                        self.sweep()
+                        next_sweep = time.monotonic() + self.interval
+                except Exception as e:
+                    print(f"Error sweeping uploads: {e}")
+
+        self._thread = threading.Thread(target=run, name='upload-sweeper', daemon=True)
+        self._thread.start()
+
+    def stats(self):
+        with self._cond:
+            return {**self._stats, "pendingReleases": len(self._released),
+                    "minAgeSeconds": self.min_age, "intervalSeconds": self.interval,
+                    "scanRate": self.scan_rate, "deleteRate": self.delete_rate}
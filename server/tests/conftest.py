@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Server modules are flat and imported by name, as app.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,101 @@
+import copy
+import json
+import threading
+
+from audit_log import EventLog, apply_event, utc_now
+from compact_model import json_default
+from mock_data import CASES
+
+
+def _dump(cases):
+    return json.dumps(cases, default=json_default, sort_keys=True)
+
+
+def _open_log(data_dir, **kwargs):
+    log = EventLog(str(data_dir), **kwargs)
+    log.recover(CASES)
+    return log
+
+
+def test_document_deletion_removes_derived_records():
+    case = copy.deepcopy(CASES[0])
+    cases_by_id = {case['id']: case}
+    statements, checks = len(case['bankStatements']), len(case['checks'])
+    for event_type, payload in [
+        ('DocumentAdded', {'document': {'id': 'DOC-S', 'name': 'statement.pdf'}}),
+        ('BankStatementExtracted', {'statement': {'id': 'BS-DOC-S', 'documentId': 'DOC-S'}}),
+        ('CheckAdded', {'check': {'type': 'Transaction Monitoring', 'documentId': 'DOC-S'}}),
+        ('DocumentDeleted', {'documentId': 'DOC-S'}),
+    ]:
+        apply_event(cases_by_id, {'caseId': case['id'], 'type': event_type, 'payload': payload})
+    assert len(case['bankStatements']) == statements
+    assert len(case['checks']) == checks
+    assert all(d['id'] != 'DOC-S' for d in case['documents'])
+
+
+def test_recovery_after_snapshot_taken_while_writers_run(tmp_path):
+    log = _open_log(tmp_path, snapshot_every=25, snapshot_chunk=1)
+    case_ids = [c['id'] for c in CASES]
+
+    def write(worker):
+        for i in range(100):
+            document = {'id': f'DOC-{worker}-{i}', 'name': f'{worker}-{i}.pdf'}
+            log.record('DocumentAdded', case_ids[i % len(case_ids)], {'document': document})
+
+    writers = [threading.Thread(target=write, args=(w,)) for w in range(4)]
+    for writer in writers:
+        writer.start()
+    log.snapshot()
+    for writer in writers:
+        writer.join()
+    expected = _dump(log._cases)
+    log.close()
+
+    recovered = EventLog(str(tmp_path))
+    assert _dump(recovered.recover(CASES)) == expected
+    recovered.close()
+
+
+def test_partial_last_line_is_truncated_on_recovery(tmp_path):
+    log = _open_log(tmp_path)
+    log.record('DecisionRecorded', CASES[0]['id'], {'status': 'Approved'})
+    log.close()
+    log_path = tmp_path / 'events.log'
+    complete = log_path.stat().st_size
+    with open(log_path, 'ab') as f:
+        f.write(b'{"seq":2,"type":"DecisionRec')
+
+    readonly = EventLog(str(tmp_path)).load_readonly(CASES)
+    assert readonly[0]['status'] == 'Approved'
+    assert log_path.stat().st_size > complete
+
+    recovered = EventLog(str(tmp_path))
+    cases = recovered.recover(CASES)
+    assert cases[0]['status'] == 'Approved'
+    assert log_path.stat().st_size == complete
+    recovered.record('DecisionRecorded', CASES[0]['id'], {'status': 'Rejected'})
+    assert [e['payload']['status'] for e in recovered.history(CASES[0]['id'])] == ['Approved', 'Rejected']
+    recovered.close()
+
+
+def test_history_after_restart_uses_snapshot_index(tmp_path):
+    log = _open_log(tmp_path)
+    case_id = CASES[0]['id']
+    for status in ('Screening', 'Decision'):
+        log.record('DecisionRecorded', case_id, {'status': status})
+    log.snapshot()
+    log.record('DecisionRecorded', case_id, {'status': 'Approved'})
+    log.record('DecisionRecorded', CASES[1]['id'], {'status': 'Rejected'})
+    log.close()
+
+    recovered = EventLog(str(tmp_path))
+    recovered.recover(CASES)
+    history = recovered.history(case_id)
+    assert [e['payload']['status'] for e in history] == ['Screening', 'Decision', 'Approved']
+    assert [e['payload']['status'] for e in recovered.history(case_id, limit=1)] == ['Approved']
+    recovered.close()
+
+
+def test_utc_now_format():
+    now = utc_now()
+    assert now.endswith('Z') and '+' not in now
@@ -0,0 +1,59 @@
+import datetime
+
+from bank_statements import analyze_statement, detect_day_first, parse_transactions
+
+
+def dates(text, **kwargs):
+    return [row[0] for row in parse_transactions(text, **kwargs)]
+
+
+def test_detect_day_first():
+    assert detect_day_first(['03/04/2024', '15/03/2024']) is True
+    assert detect_day_first(['03/04/2024', '03/15/2024']) is False
+    assert detect_day_first(['03/04/2024']) is True
+    assert detect_day_first(['2024-03-04'], default=False) is False
+
+
+def test_month_first_statement():
+    text = "03/04/2024 Salary 1,000.00\n03/15/2024 ATM cash 200.00\n"
+    assert dates(text) == [datetime.date(2024, 3, 4), datetime.date(2024, 3, 15)]
+
+
+def test_day_first_statement():
+    text = "03/04/2024 Salary 1,000.00\n15/03/2024 ATM cash 200.00\n"
+    assert dates(text) == [datetime.date(2024, 4, 3), datetime.date(2024, 3, 15)]
+
+
+def test_table_dates_and_explicit_order():
+    text = ("| Date | Description | Amount |\n|---|---|---|\n"
+            "| 02/13/2024 | Transfer | 5.00 |\n| 02/03/2024 | Fee | -6.00 |\n")
+    assert dates(text) == [datetime.date(2024, 2, 13), datetime.date(2024, 2, 3)]
+    assert dates("03/04/2024 Salary 1,000.00\n", day_first=False) == [datetime.date(2024, 3, 4)]
+
+
+def amounts(text):
+    return [row[2] for row in parse_transactions(text)]
+
+
+def test_unsigned_debit_follows_balance():
+    text = ("2024-03-01 Salary 5,000.00 10,000.00\n"
+            "2024-03-02 ATM withdrawal 2,000.00 8,000.00\n"
+            "2024-03-03 Transfer 500.00 8,500.00\n")
+    assert amounts(text) == [5000.0, -2000.0, 500.0]
+    newest_first = "\n".join(reversed(text.strip().splitlines()))
+    assert amounts(newest_first) == [500.0, -2000.0, 5000.0]
+
+
+def test_unsigned_debit_from_wording():
+    text = ("2024-03-01 ATM withdrawal 2,000.00\n"
+            "2024-03-02 Cash deposit 3,000.00\n"
+            "2024-03-03 Card fee (12.00)\n")
+    assert amounts(text) == [-2000.0, 3000.0, -12.0]
+
+
+def test_withdrawal_is_not_a_cash_deposit():
+    rows = parse_transactions("2024-03-01 ATM withdrawal 2,000.00 8,000.00\n"
+                              "2024-03-02 ATM withdrawal 2,000.00 6,000.00\n")
+    summary = analyze_statement(rows)
+    assert summary['detectorCounts']['round_cash_deposit'] == 0
+    assert summary['monthlyIncome'] == 0
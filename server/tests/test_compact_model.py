@@ -0,0 +1,63 @@
+import copy
+import json
+
+from audit_log import apply_event
+from compact_model import Case, Check, Document, compact_cases
+from mock_data import CASES
+
+
+def compact_case():
+    case = compact_cases(copy.deepcopy(CASES[:1]))[0]
+    return case, {case['id']: case}
+
+
+def test_round_trip_matches_source():
+    case, _ = compact_case()
+    assert json.dumps(case.to_dict(), sort_keys=True) == json.dumps(CASES[0], sort_keys=True)
+
+
+def test_appliers_store_records():
+    case, cases_by_id = compact_case()
+    events = [
+        ('DocumentAdded', {'document': {'id': 'DOC-A', 'name': 'a.pdf'}}),
+        ('DocumentsIngested', {'documents': [{'id': 'DOC-B', 'name': 'b.pdf'}]}),
+        ('CheckAdded', {'check': {'type': 'Duplicate Document', 'result': 'Review'}}),
+        ('BankStatementExtracted', {'statement': {'id': 'BS-DOC-A', 'notes': 'first'}}),
+        ('BankStatementExtracted', {'statement': {'id': 'BS-DOC-A', 'notes': 'second'}}),
+    ]
+    for event_type, payload in events:
+        apply_event(cases_by_id, {'caseId': case['id'], 'type': event_type, 'payload': payload})
+    assert all(type(d) is Document for d in case['documents'])
+    assert all(type(c) is Check for c in case['checks'])
+    assert all(type(s).__name__ == 'BankStatement' for s in case['bankStatements'])
+    assert case['bankStatements'][-1]['notes'] == 'second'
+
+
+def test_setdefault_returns_stored_list():
+    case = Case({'id': 'C-1'})
+    case.setdefault('checks', []).append({'type': 'PEP Screening'})
+    assert type(case['checks'][0]) is Check
+
+
+def test_packed_fields_read_back_unchanged():
+    source = {
+        'id': 'C-1',
+        'createdAt': '2025-01-08T10:30:00Z',
+        'decisionNote': 'Apprové après revue',
+        'documents': [{
+            'id': 'DOC-1', 'name': 'passport.pdf', 'uploadedAt': '2026-10-19T17:27:11.123456Z',
+            'ocr_result': {'FIN': 'G1234567N', 'extracted_text': 'line one\nline two', 'confidence': 0.95},
+            'classification': {'document_type': 'Passport', 'confidence': 0.9,
+                               'alternative_types': [{'type': 'Passport', 'confidence': 0.1}]},
+        }],
+        'riskScore': 0.25,
+    }
+    case = Case(copy.deepcopy(source))
+    assert case['createdAt'] == source['createdAt']
+    assert case['documents'][0]['uploadedAt'] == source['documents'][0]['uploadedAt']
+    assert case.to_dict() == source
+
+
+def test_unusual_timestamps_are_kept_as_text():
+    for value in ('2025-02-30T00:00:00Z', '2025-01-07 09:00:00', '2025-01-07T09:00:00+00:00'):
+        assert Case({'id': 'C-1', 'createdAt': value})['createdAt'] == value
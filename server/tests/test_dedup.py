@@ -0,0 +1,17 @@
+from dedup import HashIndex, index_backlog
+
+
+def test_backlog_skips_files_without_a_live_document(tmp_path):
+    content = b'%PDF-1.4 same statement'
+    live = tmp_path / 'C-001_DOC-1.pdf'
+    orphan = tmp_path / 'C-002_DOC-2.pdf'
+    live.write_bytes(content)
+    orphan.write_bytes(content)
+
+    matches = []
+    index = HashIndex()
+    indexed, flagged = index_backlog(index, str(tmp_path), lambda *args: matches.append(args),
+                                     live_paths=[str(live)])
+    assert (indexed, flagged) == (1, 0)
+    assert ('C-002', 'DOC-2') not in index
+    assert matches == []
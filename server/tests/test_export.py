@@ -0,0 +1,10 @@
+from export import case_matches
+
+
+def test_date_only_bounds_include_the_whole_day():
+    case = {'status': 'Approved', 'createdAt': '2025-02-01T15:30:00Z'}
+    assert case_matches(case, created_from='2025-02-01', created_to='2025-02-01')
+    assert case_matches(case, created_to='2025-02-01T15:30:00Z')
+    assert not case_matches(case, created_to='2025-01-31')
+    assert not case_matches(case, created_to='2025-02-01T15:00')
+    assert not case_matches(case, created_from='2025-02-02')
@@ -0,0 +1,28 @@
+import threading
+
+from ingestion import IngestionPool
+from scheduler import PriorityScheduler
+
+
+def test_unfinished_batches_are_not_evicted():
+    scheduler = PriorityScheduler(workers=1)
+    pool = IngestionPool(scheduler, keep_batches=2)
+    release = threading.Event()
+    try:
+        slow = pool.submit('C-001', [{"name": "slow.pdf"}],
+                           lambda item: release.wait(5) and {"id": "DOC-1"}, lambda batch, docs: None)
+        quick = [pool.submit('C-001', [], None, lambda batch, docs: None) for _ in range(3)]
+        assert pool.get(slow.id) is slow
+        assert pool.get(quick[0].id) is None
+        assert pool.get(quick[-1].id) is quick[-1]
+
+        release.set()
+        assert slow.done.wait(5)
+        assert slow.status == "completed"
+        newest = pool.submit('C-001', [], None, lambda batch, docs: None)
+        assert pool.get(slow.id) is None
+        assert pool.get(quick[-1].id) is quick[-1]
+        assert pool.get(newest.id) is newest
+    finally:
+        release.set()
+        scheduler.shutdown()
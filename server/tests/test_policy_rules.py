@@ -0,0 +1,45 @@
+import pytest
+
+from policy_rules import PolicyEngine, PolicyRuleError
+
+
+def engine(require, when=None):
+    rule = {'id': 'R-1', 'require': require}
+    if when:
+        rule['when'] = when
+    policies = [{'id': 'POL-T', 'title': 'Test', 'clause': '', 'rules': [rule]}]
+    result = PolicyEngine(policies)
+    result.rebuild([])
+    return result
+
+
+@pytest.mark.parametrize('expr', [
+    'status == 3',
+    'tier in ["VIP", 2]',
+    'check("PEP Screening") == true',
+    'riskScore < "high"',
+    'riskScore in [0.5, "x"]',
+])
+def test_literal_type_mismatch_is_rejected(expr):
+    with pytest.raises(PolicyRuleError):
+        engine(expr)
+
+
+@pytest.mark.parametrize('expr', [
+    'status in ["Approved", "Rejected"]',
+    'riskScore <= 0.7 and isWealthCustomer == false',
+    'check("PEP Screening") != "Fail"',
+])
+def test_well_typed_rules_compile(expr):
+    engine(expr)
+
+
+def test_violations_follow_rule():
+    rules = engine('riskScore < 0.7', when='tier == "VIP"')
+    rules.rebuild([
+        {'id': 'C-1', 'riskScore': 0.9, 'customer': {'tier': 'VIP'}},
+        {'id': 'C-2', 'riskScore': 0.9, 'customer': {'tier': 'Standard'}},
+    ])
+    assert [v['ruleId'] for v in rules.case_violations('C-1')] == ['R-1']
+    assert rules.case_violations('C-2') == []
+    assert rules.case_violations('C-3') is None
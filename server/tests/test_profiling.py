@@ -0,0 +1,38 @@
+import time
+
+from flask import Flask
+
+from profiling import RequestProfiler
+from scheduler import PriorityScheduler
+
+
+def classify_document():
+    deadline = time.perf_counter() + 0.2
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+    return 'ok'
+
+
+def test_capture_includes_scheduler_jobs():
+    app = Flask(__name__)
+    profiler = RequestProfiler(enabled=True, slow_ms=0, interval=0.002)
+    profiler.init_app(app)
+    scheduler = PriorityScheduler(workers=1, wrap=profiler.wrap_job)
+
+    @app.route('/upload')
+    def upload():
+        return scheduler.submit('standard', classify_document).result()
+
+    try:
+        app.test_client().get('/upload', headers={'X-Profile': '1'})
+    finally:
+        scheduler.shutdown()
+
+    capture = profiler.get(1)
+    assert any('classify_document' in stack for stack in capture["collapsed"])
+    assert 'classify_document' in capture["cprofile"]
+
+
+def test_jobs_outside_requests_run_unwrapped():
+    profiler = RequestProfiler(enabled=True)
+    assert profiler.wrap_job(classify_document) is classify_document
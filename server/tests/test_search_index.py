@@ -0,0 +1,61 @@
+from search_index import SearchIndex, parse_query
+
+
+def make_index():
+    index = SearchIndex()
+    index.index(('C-1', None), {'case': 'C-1', 'name': 'John Smith', 'tier': 'VIP'})
+    index.index(('C-2', None), {'case': 'C-2', 'name': 'Nadia Tan', 'tier': 'Standard'})
+    index.index(('C-2', 'DOC-1'), {'case': 'C-2', 'fin': 'G1234567N', 'text': 'national bank statement'})
+    return index
+
+
+def keys(index, query):
+    total, hits = index.search(query, limit=100)
+    assert total == len(hits)
+    return {(hit['caseId'], hit['documentId']) for hit in hits}
+
+
+def test_parse_query_fields_prefix_and_quotes():
+    assert parse_query('FIN:G123* smith') == [('fin', 'g123', True), (None, 'smith', False)]
+    assert parse_query('name:"John Smith"') == [('name', 'john', False), ('name', 'smith', False)]
+    assert parse_query('name:"John Sm*"') == [('name', 'john', False), ('name', 'sm', True)]
+
+
+def test_parse_query_keyword_field_keeps_whole_value():
+    assert parse_query('dob:1985-03-15') == [('dob', '1985-03-15', False)]
+
+
+def test_parse_query_empty():
+    assert parse_query('   ') == []
+
+
+def test_bare_prefix_does_not_match_field_terms():
+    # "na*" must not pick up every "name:..." term
+    assert keys(make_index(), 'na*') == {('C-2', None), ('C-2', 'DOC-1')}
+
+
+def test_field_prefix():
+    index = make_index()
+    assert keys(index, 'name:jo*') == {('C-1', None)}
+    assert keys(index, 'fin:g123*') == {('C-2', 'DOC-1')}
+    assert keys(index, 'name:x*') == set()
+
+
+def test_keyword_field_exact_match():
+    assert keys(make_index(), 'FIN:G1234567N') == {('C-2', 'DOC-1')}
+
+
+def test_all_clauses_must_match():
+    index = make_index()
+    assert keys(index, 'nadia standard') == {('C-2', None)}
+    assert keys(index, 'nadia vip') == set()
+
+
+def test_prefix_sees_reindexed_and_removed_terms():
+    index = make_index()
+    assert keys(index, 'jo*') == {('C-1', None)}
+    index.remove(('C-1', None))
+    assert keys(index, 'jo*') == set()
+    index.index(('C-1', None), {'case': 'C-1', 'name': 'Joan Smith'})
+    assert keys(index, 'jo*') == {('C-1', None)}
+    assert keys(index, 'name:jo*') == {('C-1', None)}